@@ -0,0 +1,85 @@
+import argparse
+
+import duckdb_rag as dr
+from duckdb_rag import benchmark
+
+
+def parse_list(value: str, cast=int) -> list:
+    """カンマ区切りの引数をリストに変換する"""
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def main():
+    # ロギング設定
+    dr.configure_logging()
+
+    # コマンドライン引数の設定
+    parser = argparse.ArgumentParser(
+        description="DuckDB RAG 検索ベンチマーク（合成コーパス・オフライン）"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default="1000,10000",
+        help="合成コーパスのドキュメント数（カンマ区切り、例: 1000,100000,1000000）",
+    )
+    parser.add_argument(
+        "--distributions",
+        type=str,
+        default="random,clustered",
+        help="ベクトルの分布（random, clustered のカンマ区切り）",
+    )
+    parser.add_argument(
+        "--limits",
+        type=str,
+        default="1,5,20,100",
+        help="レイテンシを計測する検索件数（カンマ区切り）",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=str,
+        default="1,2,4,8",
+        help="スループットを計測する同時実行数（カンマ区切り）",
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=100,
+        help="各計測で実行するクエリ数",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    parser.add_argument(
+        "--content-chars",
+        type=int,
+        default=0,
+        help="合成ドキュメントの本文の文字数（大きな本文での検索を計測する場合に指定）",
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=str,
+        default="benchmark_data",
+        help="合成コーパスを保存するディレクトリ（生成済みのものは再利用する）",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="benchmark_results.json",
+        help="結果を保存するJSONファイルのパス",
+    )
+    args = parser.parse_args()
+
+    results = benchmark.run_benchmark(
+        work_dir=args.work_dir,
+        sizes=parse_list(args.sizes),
+        distributions=parse_list(args.distributions, str),
+        limits=parse_list(args.limits),
+        concurrency_levels=parse_list(args.concurrency),
+        query_count=args.queries,
+        seed=args.seed,
+        content_chars=args.content_chars,
+    )
+    benchmark.save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
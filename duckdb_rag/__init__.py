@@ -1,4 +1,7 @@
 from .database import (
+    VECTOR_DIMENSION,
+    DEFAULT_ROW_GROUP_SIZE,
+    DEFAULT_COMPRESSION,
     initialize_db,
     load_vectors_from_parquet,
     save_vectors_to_parquet,
@@ -6,9 +9,59 @@ from .database import (
     add_document,
     add_documents_batch,
     get_document_count,
+    read_parquet_metadata,
+    search_document_ids,
+    create_hnsw_index,
+    insert_documents,
+    update_document,
+    delete_documents,
+    get_documents,
 )
 
-from .model import load_model, encode_document, encode_query, get_device_info
+from .model import (
+    DEFAULT_MODEL_NAME,
+    load_model,
+    encode_document,
+    embed_documents,
+    encode_query,
+    get_device_info,
+)
+
+from .dedup import (
+    DocumentDeduplicator,
+    content_hash,
+    collapse_duplicates,
+)
+
+from .metrics import (
+    SearchMetrics,
+    StageTimer,
+    TimedTokenizer,
+    take_tokenize_seconds,
+    write_prometheus_file,
+    start_metrics_server,
+)
+
+from .embedding_cache import (
+    DEFAULT_MAX_ENTRIES as DEFAULT_CACHE_ENTRIES,
+    EmbeddingCache,
+)
+
+from .mmap_store import (
+    MmapVectorStore,
+    export_mmap_store,
+    default_mmap_directory,
+)
+
+from .snippet import (
+    DEFAULT_SNIPPET_CHARS,
+    best_passage,
+    truncate_to_budget,
+)
+
+from .parquet_writer import ParquetVectorWriter
+
+from .write_behind import WriteBehindQueue
 
 from .utils import (
     get_markdown_files,
@@ -19,6 +72,9 @@ from .utils import (
 
 __all__ = [
     # database
+    "VECTOR_DIMENSION",
+    "DEFAULT_ROW_GROUP_SIZE",
+    "DEFAULT_COMPRESSION",
     "initialize_db",
     "load_vectors_from_parquet",
     "save_vectors_to_parquet",
@@ -26,11 +82,46 @@ __all__ = [
     "add_document",
     "add_documents_batch",
     "get_document_count",
+    "read_parquet_metadata",
+    "search_document_ids",
+    "create_hnsw_index",
+    "insert_documents",
+    "update_document",
+    "delete_documents",
+    "get_documents",
     # model
+    "DEFAULT_MODEL_NAME",
     "load_model",
     "encode_document",
+    "embed_documents",
     "encode_query",
     "get_device_info",
+    # dedup
+    "DocumentDeduplicator",
+    "content_hash",
+    "collapse_duplicates",
+    # metrics
+    "SearchMetrics",
+    "StageTimer",
+    "TimedTokenizer",
+    "take_tokenize_seconds",
+    "write_prometheus_file",
+    "start_metrics_server",
+    # embedding_cache
+    "DEFAULT_CACHE_ENTRIES",
+    "EmbeddingCache",
+    # mmap_store
+    "MmapVectorStore",
+    "export_mmap_store",
+    "default_mmap_directory",
+    # snippet
+    "DEFAULT_SNIPPET_CHARS",
+    "best_passage",
+    "truncate_to_budget",
+    # parquet_writer
+    "ParquetVectorWriter",
+    # write_behind
+    "WriteBehindQueue",
     # utils
     "get_markdown_files",
     "load_markdown_file",
@@ -0,0 +1,395 @@
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import duckdb
+
+from .database import (
+    VECTOR_DIMENSION,
+    get_document_count,
+    initialize_db,
+    load_vectors_from_parquet,
+    format_vector,
+    parquet_copy_options,
+    search_document_ids,
+    search_documents,
+)
+
+DISTRIBUTIONS = ("random", "clustered")
+
+# クラスタ分布でのクラスタ数と、中心からのばらつきの大きさ
+DEFAULT_CLUSTERS = 64
+CLUSTER_NOISE = 0.3
+
+# 大きなドキュメントの本文を埋める文字列
+_FILLER = "lorem ipsum dolor sit amet "
+
+
+def _random_value_sql(seed: int, *keys: str) -> str:
+    """seed と keys から決定的に [-1, 1) の値を生成するSQL式を返す
+
+    DuckDBの random() はスレッド数によって結果が変わるため、ハッシュ値から
+    擬似乱数を作ることでスレッド数に依存せず同じコーパスを再現する。
+    """
+    return f"((hash({seed}, {', '.join(keys)}) % 2000001)::FLOAT / 1000000 - 1)"
+
+
+def _vector_sql(distribution: str, seed: int, row: str, clusters: int) -> str:
+    """分布に従ったベクトルを生成するSQL式を返す"""
+    if distribution == "random":
+        element = _random_value_sql(seed, row, "j")
+    elif distribution == "clustered":
+        cluster = f"(hash({seed}, 'cluster', {row}) % {clusters})"
+        centroid = _random_value_sql(seed, "'centroid'", cluster, "j")
+        noise = _random_value_sql(seed, "'noise'", row, "j")
+        element = f"({centroid} + {CLUSTER_NOISE} * {noise})"
+    else:
+        raise ValueError(f"Unknown distribution: {distribution}")
+    return (
+        f"list_transform(range({VECTOR_DIMENSION}), j -> {element})"
+        f"::FLOAT[{VECTOR_DIMENSION}]"
+    )
+
+
+def generate_corpus(
+    parquet_path: str,
+    size: int,
+    distribution: str = "random",
+    seed: int = 42,
+    clusters: int = DEFAULT_CLUSTERS,
+    content_chars: int = 0,
+) -> float:
+    """合成コーパスを生成してParquetファイルに書き出す
+
+    Args:
+        parquet_path: 出力先のParquetファイルパス
+        size: ドキュメント数
+        distribution: ベクトルの分布（random または clustered）
+        seed: 乱数シード
+        clusters: clustered の場合のクラスタ数
+        content_chars: 本文の文字数（0 なら短い本文のみ）
+
+    Returns:
+        float: 生成にかかった秒数
+    """
+    logging.info(f"Generating {distribution} corpus of {size} vectors")
+    start = time.perf_counter()
+    conn = duckdb.connect()
+    try:
+        metadata = {
+            "vector_dimension": str(VECTOR_DIMENSION),
+            "model_name": f"synthetic-{distribution}",
+            "document_count": str(size),
+            "seed": str(seed),
+            "content_chars": str(content_chars),
+        }
+        content = "'synthetic document ' || i"
+        if content_chars > 0:
+            repeat = content_chars // len(_FILLER) + 1
+            content = (
+                f"left({content} || ' ' || repeat('{_FILLER}', {repeat}), "
+                f"{content_chars})"
+            )
+        conn.sql(
+            f"""
+            COPY (
+                SELECT
+                    i::INTEGER AS id,
+                    {content} AS content,
+                    {_vector_sql(distribution, seed, "i", clusters)} AS vector
+                FROM range(1, {size + 1}) t(i)
+            ) TO '{parquet_path}' {parquet_copy_options(metadata=metadata)}
+            """
+        )
+    finally:
+        conn.close()
+    return time.perf_counter() - start
+
+
+def generate_queries(
+    count: int,
+    distribution: str = "random",
+    seed: int = 42,
+    clusters: int = DEFAULT_CLUSTERS,
+) -> list[list[float]]:
+    """コーパスと同じ分布に従うクエリベクトルを生成する
+
+    コーパスとは異なる行番号を使うため、クエリがコーパスの行と一致することはない。
+
+    Args:
+        count: クエリ数
+        distribution: ベクトルの分布（random または clustered）
+        seed: コーパス生成時と同じ乱数シード
+        clusters: clustered の場合のクラスタ数
+
+    Returns:
+        list[list[float]]: クエリベクトルのリスト
+    """
+    conn = duckdb.connect()
+    try:
+        rows = conn.sql(
+            f"""
+            SELECT {_vector_sql(distribution, seed, "-i", clusters)}
+            FROM range(1, {count + 1}) t(i)
+            ORDER BY i
+            """
+        ).fetchall()
+    finally:
+        conn.close()
+    return [list(row[0]) for row in rows]
+
+
+def _rss_mb() -> float:
+    """現在のプロセスの常駐メモリ量（MB）"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        # /proc がない環境ではピーク値で代用する（macOSはバイト、Linuxはキロバイト）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if platform.system() == "Darwin" else peak / 1e3
+
+
+def _duckdb_memory_mb(conn: Any) -> float:
+    """DuckDBが確保しているメモリ量（MB）"""
+    fetch_result = conn.sql(
+        "SELECT SUM(memory_usage_bytes) FROM duckdb_memory()"
+    ).fetchone()
+    if fetch_result is None or fetch_result[0] is None:
+        return 0.0
+    return int(fetch_result[0]) / 1e6
+
+
+def summarize_latency(seconds: list[float]) -> dict[str, float]:
+    """レイテンシのリストを集計する（ミリ秒）"""
+    values = sorted(seconds)
+    n = len(values)
+    return {
+        "mean_ms": round(sum(values) / n * 1000, 3),
+        "p50_ms": round(values[min(n - 1, int(0.50 * n))] * 1000, 3),
+        "p95_ms": round(values[min(n - 1, int(0.95 * n))] * 1000, 3),
+        "p99_ms": round(values[min(n - 1, int(0.99 * n))] * 1000, 3),
+    }
+
+
+def single_query_search(
+    conn: Any, vector: list[float], limit: int
+) -> list[tuple[str, float, int]]:
+    """内容と距離を1つのクエリで取得する検索（search_documents の比較用）
+
+    順位付けの対象の全行について内容の列も読むため、本文が大きいほど遅くなる。
+    """
+    return conn.sql(
+        f"""
+        SELECT content, array_cosine_distance(vector, ?::FLOAT[{VECTOR_DIMENSION}]) as distance, id
+        FROM article
+        ORDER BY distance
+        LIMIT ?
+        """,
+        params=[format_vector(vector), limit],
+    ).fetchall()
+
+
+def measure_latency(
+    conn: Any,
+    queries: list[list[float]],
+    limit: int,
+    search: Callable[[Any, list[float], int], Any] = search_documents,
+) -> dict[str, float]:
+    """クエリを1件ずつ順に実行してレイテンシを計測する
+
+    Args:
+        conn: DuckDB接続
+        queries: クエリベクトルのリスト
+        limit: 検索で返す件数
+        search: 計測する検索関数
+
+    Returns:
+        dict[str, float]: 平均とパーセンタイル（ミリ秒）
+    """
+    # 初回実行のコストを除くためのウォームアップ
+    search(conn, queries[0], limit)
+
+    seconds = []
+    for query in queries:
+        start = time.perf_counter()
+        search(conn, query, limit)
+        seconds.append(time.perf_counter() - start)
+    return {"limit": limit, **summarize_latency(seconds)}
+
+
+def measure_throughput(
+    conn: Any, queries: list[list[float]], limit: int, concurrency: int
+) -> dict[str, float]:
+    """複数スレッドから同時に検索してスループットを計測する
+
+    DuckDBの接続はスレッド間で共有できないため、スレッドごとにカーソルを使う。
+
+    Args:
+        conn: DuckDB接続
+        queries: クエリベクトルのリスト（全スレッドで分担して実行する）
+        limit: 検索で返す件数
+        concurrency: 同時実行スレッド数
+
+    Returns:
+        dict[str, float]: 毎秒クエリ数とレイテンシ
+    """
+    cursors = [conn.cursor() for _ in range(concurrency)]
+    try:
+
+        def worker(index: int) -> list[float]:
+            cursor = cursors[index]
+            seconds = []
+            for query in queries[index::concurrency]:
+                start = time.perf_counter()
+                search_documents(cursor, query, limit)
+                seconds.append(time.perf_counter() - start)
+            return seconds
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - start
+    finally:
+        for cursor in cursors:
+            cursor.close()
+
+    seconds = [s for result in results for s in result]
+    return {
+        "concurrency": concurrency,
+        "limit": limit,
+        "qps": round(len(seconds) / elapsed, 3),
+        **summarize_latency(seconds),
+    }
+
+
+def run_benchmark(
+    work_dir: str,
+    sizes: list[int],
+    distributions: list[str],
+    limits: list[int],
+    concurrency_levels: list[int],
+    query_count: int = 100,
+    seed: int = 42,
+    content_chars: int = 0,
+) -> dict[str, Any]:
+    """合成コーパスに対する読み込みと検索のベンチマークを実行する
+
+    検索結果を返すまでのレイテンシ（latency）に加え、順位付けだけの
+    レイテンシ（rank_latency）と、内容を1つのクエリで取得した場合の
+    レイテンシ（single_query_latency）を計測し、内容の取得にかかる時間を比較する。
+
+    Args:
+        work_dir: 合成コーパスを書き出すディレクトリ（生成済みなら再利用する）
+        sizes: コーパスのドキュメント数のリスト
+        distributions: ベクトルの分布のリスト
+        limits: 計測する検索件数のリスト
+        concurrency_levels: スループットを計測する同時実行数のリスト（limits の各件数で計測）
+        query_count: 各計測で実行するクエリ数
+        seed: 乱数シード
+        content_chars: 本文の文字数（0 なら短い本文のみ）
+
+    Returns:
+        dict[str, Any]: 環境情報・設定・計測結果
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+
+    for distribution in distributions:
+        queries = generate_queries(query_count, distribution, seed)
+
+        for size in sizes:
+            name = f"{distribution}-{size}"
+            if content_chars > 0:
+                name += f"-c{content_chars}"
+            parquet_path = os.path.join(work_dir, f"{name}-seed{seed}.parquet")
+            generate_seconds = None
+            if not os.path.exists(parquet_path):
+                generate_seconds = generate_corpus(
+                    parquet_path, size, distribution, seed, content_chars=content_chars
+                )
+
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            conn = initialize_db(extensions=())
+            try:
+                load_vectors_from_parquet(conn, parquet_path)
+                load_seconds = time.perf_counter() - start
+
+                result: dict[str, Any] = {
+                    "distribution": distribution,
+                    "corpus_size": get_document_count(conn),
+                    "file_mb": round(os.path.getsize(parquet_path) / 1e6, 3),
+                    "generate_seconds": generate_seconds,
+                    "load_seconds": round(load_seconds, 3),
+                    "rss_delta_mb": round(_rss_mb() - rss_before, 3),
+                    "duckdb_memory_mb": round(_duckdb_memory_mb(conn), 3),
+                    "latency": [],
+                    "rank_latency": [],
+                    "single_query_latency": [],
+                    "throughput": [],
+                }
+                for limit in limits:
+                    logging.info(
+                        f"Measuring latency: {distribution}/{size} limit={limit}"
+                    )
+                    result["latency"].append(measure_latency(conn, queries, limit))
+                    result["rank_latency"].append(
+                        measure_latency(conn, queries, limit, search_document_ids)
+                    )
+                    result["single_query_latency"].append(
+                        measure_latency(conn, queries, limit, single_query_search)
+                    )
+                for limit in limits:
+                    for concurrency in concurrency_levels:
+                        logging.info(
+                            f"Measuring throughput: {distribution}/{size} "
+                            f"limit={limit} concurrency={concurrency}"
+                        )
+                        result["throughput"].append(
+                            measure_throughput(conn, queries, limit, concurrency)
+                        )
+                results.append(result)
+            finally:
+                conn.close()
+
+    return {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "duckdb": duckdb.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "sizes": sizes,
+            "distributions": distributions,
+            "limits": limits,
+            "concurrency_levels": concurrency_levels,
+            "query_count": query_count,
+            "seed": seed,
+            "content_chars": content_chars,
+            "vector_dimension": VECTOR_DIMENSION,
+        },
+        "results": results,
+    }
+
+
+def save_results(results: dict[str, Any], output_path: str) -> None:
+    """ベンチマーク結果をJSONファイルとして保存する
+
+    Args:
+        results: run_benchmark の戻り値
+        output_path: 出力先のJSONファイルパス
+    """
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    logging.info(f"Benchmark results saved to '{output_path}'")
@@ -4,12 +4,23 @@ from typing import Any
 
 import duckdb
 
+# ベクトルの次元数（pfnet/plamo-embedding-1b の出力次元）
+VECTOR_DIMENSION = 2048
 
-def initialize_db(home_directory: str | None = None) -> Any:
+# Parquetファイルのデフォルトの書き出し設定
+DEFAULT_ROW_GROUP_SIZE = 1024
+DEFAULT_COMPRESSION = "zstd"
+
+
+def initialize_db(
+    home_directory: str | None = None, extensions: tuple[str, ...] = ("vss",)
+) -> Any:
     """DuckDBデータベースを初期化する
 
     Args:
         home_directory: DuckDBのホームディレクトリパス（任意）
+        extensions: インストールしてロードする拡張機能
+            （array_cosine_distance はコア機能のため、空でも検索は動作する）
 
     Returns:
         duckdb.Connection: 初期化されたデータベース接続
@@ -19,13 +30,16 @@ def initialize_db(home_directory: str | None = None) -> Any:
         conn = duckdb.connect()
         if home_directory:
             conn.sql(f"SET home_directory='{home_directory}'")
-        conn.sql("INSTALL vss")
-        conn.sql("LOAD vss")
+        for extension in extensions:
+            conn.sql(f"INSTALL {extension}")
+            conn.sql(f"LOAD {extension}")
 
         conn.sql("CREATE SEQUENCE IF NOT EXISTS id_sequence START 1;")
         conn.sql(
-            "CREATE TABLE IF NOT EXISTS article (id INTEGER DEFAULT nextval('id_sequence'), content TEXT, vector FLOAT[2048]);"
+            f"CREATE TABLE IF NOT EXISTS article (id INTEGER DEFAULT nextval('id_sequence'), content TEXT, vector FLOAT[{VECTOR_DIMENSION}]);"
         )
+        # 検索結果の内容をIDで取得する際にインデックススキャンを使う
+        conn.sql("CREATE INDEX IF NOT EXISTS article_id ON article (id);")
         logging.info("Database initialized successfully")
         return conn
     except Exception as e:
@@ -46,9 +60,13 @@ def load_vectors_from_parquet(conn: Any, parquet_path: str) -> int:
     if os.path.exists(parquet_path):
         logging.info(f"Loading vectors from parquet file '{parquet_path}'")
         try:
+            validate_parquet_metadata(read_parquet_metadata(conn, parquet_path))
+            # 列の並び順に依存しないよう列名で指定して読み込む
             conn.sql(
-                f"INSERT INTO article SELECT * FROM read_parquet('{parquet_path}')"
+                "INSERT INTO article (id, content, vector) "
+                f"SELECT id, content, vector FROM read_parquet('{parquet_path}')"
             )
+            sync_id_sequence(conn)
             result = conn.sql("SELECT COUNT(*) FROM article")
             fetch_result = result.fetchone()
             if fetch_result is not None:
@@ -66,19 +84,118 @@ def load_vectors_from_parquet(conn: Any, parquet_path: str) -> int:
         return 0
 
 
-def save_vectors_to_parquet(conn: Any, parquet_path: str) -> bool:
+def sync_id_sequence(conn: Any) -> None:
+    """IDシーケンスを既存の最大IDより先へ進める
+
+    Parquetから読み込んだ行はIDを明示して挿入されるため、その後に追加する
+    ドキュメントのIDが重複しないようシーケンスを進めておく。
+
+    Args:
+        conn: DuckDB接続
+    """
+    fetch_result = conn.sql("SELECT COALESCE(MAX(id), 0) FROM article").fetchone()
+    max_id = int(fetch_result[0]) if fetch_result is not None else 0
+    if max_id > 0:
+        conn.execute(
+            "SELECT MAX(nextval('id_sequence')) FROM range(?)", [max_id]
+        ).fetchall()
+
+
+def read_parquet_metadata(conn: Any, parquet_path: str) -> dict[str, str]:
+    """Parquetファイルに書き込まれたキーバリューメタデータを取得する
+
+    Args:
+        conn: DuckDB接続
+        parquet_path: Parquetファイルのパス
+
+    Returns:
+        dict[str, str]: メタデータの辞書（メタデータがなければ空）
+    """
+    rows = conn.sql(
+        f"SELECT decode(key), decode(value) FROM parquet_kv_metadata('{parquet_path}')"
+    ).fetchall()
+    return {str(key): str(value) for key, value in rows}
+
+
+def validate_parquet_metadata(metadata: dict[str, str]) -> None:
+    """Parquetのメタデータがこのデータベースと互換性があるか検証する
+
+    メタデータを持たない古いファイルは検証せずに受け入れる。
+
+    Args:
+        metadata: read_parquet_metadataで取得したメタデータ
+
+    Raises:
+        ValueError: ベクトルの次元数が一致しない場合
+    """
+    dimension = metadata.get("vector_dimension")
+    if dimension is not None and int(dimension) != VECTOR_DIMENSION:
+        raise ValueError(
+            f"Vector dimension mismatch: file has {dimension}, "
+            f"expected {VECTOR_DIMENSION}"
+        )
+
+
+def parquet_copy_options(
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = DEFAULT_COMPRESSION,
+    compression_level: int | None = None,
+    metadata: dict[str, str] | None = None,
+) -> str:
+    """COPY ... TO 文に渡すParquetの書き出しオプションを組み立てる
+
+    Args:
+        row_group_size: 1つの行グループに含める行数
+        compression: 圧縮コーデック（zstd, snappy, gzip, lz4, uncompressed など）
+        compression_level: 圧縮レベル（zstdのみ有効）
+        metadata: ファイルに書き込むキーバリューメタデータ
+
+    Returns:
+        str: 括弧で囲まれたオプション文字列
+    """
+    options = [
+        "FORMAT PARQUET",
+        f"ROW_GROUP_SIZE {int(row_group_size)}",
+        f"COMPRESSION {compression}",
+    ]
+    if compression_level is not None:
+        options.append(f"COMPRESSION_LEVEL {int(compression_level)}")
+    if metadata:
+        pairs = ", ".join(
+            f"{key}: '{str(value).replace(chr(39), chr(39) * 2)}'"
+            for key, value in metadata.items()
+        )
+        options.append(f"KV_METADATA {{{pairs}}}")
+    return f"({', '.join(options)})"
+
+
+def save_vectors_to_parquet(
+    conn: Any,
+    parquet_path: str,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = DEFAULT_COMPRESSION,
+    compression_level: int | None = None,
+    metadata: dict[str, str] | None = None,
+) -> bool:
     """ベクトルデータをParquetファイルとして保存する
 
     Args:
         conn: DuckDB接続
         parquet_path: 保存先のParquetファイルパス
+        row_group_size: 1つの行グループに含める行数
+        compression: 圧縮コーデック
+        compression_level: 圧縮レベル（zstdのみ有効）
+        metadata: ファイルに書き込むキーバリューメタデータ
 
     Returns:
         bool: 保存が成功したかどうか
     """
     logging.info(f"Saving vectorized data to '{parquet_path}'")
     try:
-        conn.sql(f"COPY article TO '{parquet_path}' (FORMAT PARQUET)")
+        options = parquet_copy_options(
+            row_group_size, compression, compression_level, metadata
+        )
+        conn.sql(f"COPY article TO '{parquet_path}' {options}")
         logging.info(f"Successfully saved vectors to '{parquet_path}'")
         return True
     except Exception as e:
@@ -88,30 +205,76 @@ def save_vectors_to_parquet(conn: Any, parquet_path: str) -> bool:
 
 def search_documents(
     conn: Any, vector: list[float], limit: int = 5
-) -> list[tuple[str, float]]:
+) -> list[tuple[str, float, int]]:
     """ベクトル検索を実行する
 
+    順位付けはIDとベクトルの列だけを読む search_document_ids で行い、
+    内容は上位 limit 件のIDについてだけ get_documents で取得する。
+    内容の列が大きくても、順位付けの際に全行分の内容を読まずに済む。
+
+    Args:
+        conn: DuckDB接続
+        vector: 検索クエリのベクトル
+        limit: 返す結果の最大数
+
+    Returns:
+        list[tuple[str, float, int]]: ドキュメントコンテンツ・距離・IDのリスト
+    """
+    ranked = search_document_ids(conn, vector, limit)
+    contents = dict(get_documents(conn, [doc_id for doc_id, _ in ranked]))
+    return [
+        (contents[doc_id], distance, doc_id)
+        for doc_id, distance in ranked
+        if doc_id in contents
+    ]
+
+
+def search_document_ids(
+    conn: Any, vector: list[float], limit: int = 5
+) -> list[tuple[int, float]]:
+    """ベクトル検索を実行し、ドキュメントIDと距離を返す
+
+    クエリベクトルはリテラルとしてSQLに埋め込む。vss拡張のHNSWインデックスは
+    定数のクエリベクトルに対してのみ使われるため。
+
     Args:
         conn: DuckDB接続
         vector: 検索クエリのベクトル
         limit: 返す結果の最大数
 
     Returns:
-        list[tuple[str, float]]: ドキュメントコンテンツと距離のリスト
+        list[tuple[int, float]]: ドキュメントIDと距離のリスト
     """
     result = conn.sql(
-        """
-        SELECT content, array_cosine_distance(vector, ?::FLOAT[2048]) as distance
+        f"""
+        SELECT id, array_cosine_distance(vector, '{format_vector(vector)}'::FLOAT[{VECTOR_DIMENSION}]) as distance
         FROM article
         ORDER BY distance
         LIMIT ?
         """,
-        params=[vector, limit],
+        params=[limit],
     )
 
     return result.fetchall()
 
 
+def create_hnsw_index(conn: Any, m: int = 16, ef_construction: int = 128) -> None:
+    """article テーブルにコサイン距離のHNSWインデックスを作成する（vss拡張が必要）
+
+    インデックス作成後の検索は近似検索となる。
+
+    Args:
+        conn: DuckDB接続
+        m: 各ノードの最大近傍数
+        ef_construction: 構築時の候補リストの大きさ
+    """
+    logging.info(f"Creating HNSW index (m={m}, ef_construction={ef_construction})")
+    conn.sql(
+        "CREATE INDEX IF NOT EXISTS article_hnsw ON article USING HNSW (vector) "
+        f"WITH (metric = 'cosine', m = {int(m)}, ef_construction = {int(ef_construction)})"
+    )
+
+
 def add_document(conn: Any, content: str, vector: list[float]) -> bool:
     """ドキュメントをデータベースに追加する
 
@@ -160,6 +323,109 @@ def add_documents_batch(
         return False
 
 
+def format_vector(vector: list[float]) -> str:
+    """ベクトルをDuckDBの配列リテラル文字列に変換する
+
+    Pythonのリストをそのままパラメータに渡すと要素ごとの型変換に時間が
+    かかるため、文字列として渡してSQL側で配列にキャストする。
+
+    Args:
+        vector: ベクトル
+
+    Returns:
+        str: "[0.1, 0.2, ...]" 形式の文字列
+    """
+    return str([float(x) for x in vector])
+
+
+def insert_documents(
+    conn: Any, contents: list[str], vectors: list[list[float]]
+) -> list[int]:
+    """複数のドキュメントを追加し、割り当てられたIDを返す
+
+    Args:
+        conn: DuckDB接続
+        contents: ドキュメントのテキスト内容のリスト
+        vectors: ドキュメントのベクトル表現のリスト（contentsと同じ順序）
+
+    Returns:
+        list[int]: 追加されたドキュメントのID（contentsと同じ順序）
+    """
+    ids = []
+    for content, vector in zip(contents, vectors):
+        fetch_result = conn.execute(
+            "INSERT INTO article (content, vector) "
+            f"VALUES (?, ?::FLOAT[{VECTOR_DIMENSION}]) RETURNING id",
+            [content, format_vector(vector)],
+        ).fetchone()
+        ids.append(int(fetch_result[0]))
+    return ids
+
+
+def update_document(
+    conn: Any, document_id: int, content: str, vector: list[float]
+) -> bool:
+    """既存のドキュメントの内容とベクトルを更新する
+
+    Args:
+        conn: DuckDB接続
+        document_id: 更新するドキュメントのID
+        content: 新しいテキスト内容
+        vector: 新しいベクトル表現
+
+    Returns:
+        bool: ドキュメントが存在し更新されたかどうか
+    """
+    rows = conn.execute(
+        f"UPDATE article SET content = ?, vector = ?::FLOAT[{VECTOR_DIMENSION}] "
+        "WHERE id = ? RETURNING id",
+        [content, format_vector(vector), document_id],
+    ).fetchall()
+    return len(rows) > 0
+
+
+def delete_documents(conn: Any, document_ids: list[int]) -> int:
+    """ドキュメントを削除する
+
+    Args:
+        conn: DuckDB接続
+        document_ids: 削除するドキュメントのIDのリスト
+
+    Returns:
+        int: 削除されたドキュメント数
+    """
+    if not document_ids:
+        return 0
+    rows = conn.execute(
+        "DELETE FROM article WHERE id IN (SELECT unnest(?::INTEGER[])) RETURNING id",
+        [document_ids],
+    ).fetchall()
+    return len(rows)
+
+
+def get_documents(conn: Any, ids: list[int]) -> list[tuple[int, str]]:
+    """IDを指定してドキュメントの内容を取得する
+
+    IDはリテラルのリストとしてSQLに埋め込む。パラメータのリストを展開する
+    形ではidのインデックスが使われず、全行の内容を走査してしまうため。
+
+    Args:
+        conn: DuckDB接続
+        ids: 取得するドキュメントのIDリスト
+
+    Returns:
+        list[tuple[int, str]]: 見つかったドキュメントのIDと内容（ids の順序）
+    """
+    if not ids:
+        return []
+    id_list = ", ".join(str(int(doc_id)) for doc_id in ids)
+    rows = conn.sql(
+        f"SELECT id, content FROM article WHERE id IN ({id_list})"
+    ).fetchall()
+    contents = {int(doc_id): content for doc_id, content in rows}
+    return [(doc_id, contents[doc_id]) for doc_id in ids if doc_id in contents]
+
+
 def get_document_count(conn: Any) -> int:
     """データベース内のドキュメント数を取得する
 
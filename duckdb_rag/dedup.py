@@ -0,0 +1,261 @@
+import hashlib
+import re
+import zlib
+from collections.abc import Callable, Sequence
+from typing import TypeVar
+
+import numpy as np
+
+# 近似重複とみなす推定Jaccard類似度のデフォルト値
+DEFAULT_NEAR_DUPLICATE_THRESHOLD = 0.9
+
+# MinHashの設定（ハッシュ数 = バンド数 × バンドあたりの行数）
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 32
+DEFAULT_SHINGLE_SIZE = 5
+
+# 普遍ハッシュに使うメルセンヌ素数（32bitハッシュとの積がuint64に収まる）
+_MERSENNE_PRIME = (1 << 31) - 1
+
+_WHITESPACE = re.compile(r"\s+")
+
+T = TypeVar("T")
+
+
+def normalize_content(text: str) -> str:
+    """重複判定のために空白の違いを吸収した文字列を返す"""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def content_hash(text: str) -> str:
+    """正規化した内容のSHA-256ハッシュ（16進数）を返す
+
+    Args:
+        text: ドキュメントのテキスト内容
+
+    Returns:
+        str: 内容のハッシュ値
+    """
+    return hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """文字n-gramのMinHashシグネチャを計算する
+
+    日本語のように単語が空白で区切られない文章にも使えるよう、
+    単語ではなく文字単位のシングルを使う。
+    """
+
+    def __init__(
+        self,
+        num_perm: int = DEFAULT_NUM_PERM,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        """
+        Args:
+            num_perm: シグネチャの長さ（ハッシュ関数の数）
+            shingle_size: シングルの文字数
+            seed: ハッシュ関数の係数を決める乱数シード
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """テキストのMinHashシグネチャを計算する
+
+        Args:
+            text: ドキュメントのテキスト内容
+
+        Returns:
+            np.ndarray: 長さ num_perm のシグネチャ
+        """
+        normalized = normalize_content(text)
+        n = self.shingle_size
+        shingles = {
+            normalized[i : i + n] for i in range(max(1, len(normalized) - n + 1))
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (self._a * hashes + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """2つのMinHashシグネチャから推定したJaccard類似度"""
+    return float(np.mean(a == b))
+
+
+class NearDuplicateIndex:
+    """MinHashとLSHで近似重複の候補を高速に探すインデックス"""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_NEAR_DUPLICATE_THRESHOLD,
+        bands: int = DEFAULT_BANDS,
+        hasher: MinHasher | None = None,
+    ):
+        """
+        Args:
+            threshold: 近似重複とみなす推定Jaccard類似度
+            bands: LSHのバンド数（num_perm を割り切れる値）
+            hasher: シグネチャの計算に使う MinHasher
+        """
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands != 0:
+            raise ValueError("bands must divide num_perm")
+        self.bands = bands
+        self._rows = self.hasher.num_perm // bands
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+        self._signatures: list[np.ndarray] = []
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [
+            signature[i * self._rows : (i + 1) * self._rows].tobytes()
+            for i in range(self.bands)
+        ]
+
+    def query(self, signature: np.ndarray) -> int | None:
+        """登録済みの近似重複を探す
+
+        Args:
+            signature: MinHashシグネチャ
+
+        Returns:
+            int | None: 近似重複の登録番号（見つからなければ None）
+        """
+        candidates: set[int] = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        for candidate in sorted(candidates):
+            if (
+                estimate_jaccard(signature, self._signatures[candidate])
+                >= self.threshold
+            ):
+                return candidate
+        return None
+
+    def add(self, signature: np.ndarray) -> int:
+        """シグネチャを登録する
+
+        Returns:
+            int: 登録番号
+        """
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(index)
+        return index
+
+
+class DocumentDeduplicator:
+    """取り込み時に完全一致と近似重複のドキュメントを検出する"""
+
+    def __init__(self, near_duplicate_threshold: float | None = None):
+        """
+        Args:
+            near_duplicate_threshold: 近似重複とみなす推定Jaccard類似度
+                （None なら完全一致のみ検出する）
+        """
+        self._hashes: set[str] = set()
+        self._near_index = (
+            NearDuplicateIndex(near_duplicate_threshold)
+            if near_duplicate_threshold is not None
+            else None
+        )
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def check(self, text: str) -> str | None:
+        """ドキュメントが既出か判定し、新しいドキュメントなら登録する
+
+        Args:
+            text: ドキュメントのテキスト内容
+
+        Returns:
+            str | None: 重複の種類（"exact" または "near"）、新規なら None
+        """
+        digest = content_hash(text)
+        if digest in self._hashes:
+            self.exact_duplicates += 1
+            return "exact"
+
+        if self._near_index is not None:
+            signature = self._near_index.hasher.signature(text)
+            if self._near_index.query(signature) is not None:
+                self.near_duplicates += 1
+                return "near"
+            self._near_index.add(signature)
+
+        self._hashes.add(digest)
+        return None
+
+
+def collapse_duplicates(
+    items: Sequence[T],
+    content: Callable[[T], str],
+    distance: Callable[[T], float],
+    threshold: float = DEFAULT_NEAR_DUPLICATE_THRESHOLD,
+    max_distance_gap: float = 0.02,
+    hasher: MinHasher | None = None,
+) -> list[T]:
+    """距離順に並んだ検索結果から重複したドキュメントをまとめる
+
+    各グループで最も距離の小さい結果だけを残す。近似重複は埋め込みも
+    ほぼ同じになりクエリとの距離も近いため、距離の差が max_distance_gap
+    以内の組に限ってMinHashで比較し、比較の回数を抑える。
+
+    Args:
+        items: 距離の昇順に並んだ検索結果
+        content: 結果からテキスト内容を取り出す関数
+        distance: 結果から距離を取り出す関数
+        threshold: 近似重複とみなす推定Jaccard類似度
+        max_distance_gap: 近似重複の候補とする距離の差の上限
+        hasher: シグネチャの計算に使う MinHasher
+
+    Returns:
+        list[T]: 重複を除いた検索結果（元の順序を保つ）
+    """
+    hasher = hasher or MinHasher()
+    kept: list[T] = []
+    kept_indices: list[int] = []
+    kept_hashes: set[str] = set()
+    # シグネチャは比較が必要になった時点で計算してキャッシュする
+    signatures: dict[int, np.ndarray] = {}
+
+    def signature_of(index: int, text: str) -> np.ndarray:
+        if index not in signatures:
+            signatures[index] = hasher.signature(text)
+        return signatures[index]
+
+    for index, item in enumerate(items):
+        text = content(item)
+        digest = content_hash(text)
+        if digest in kept_hashes:
+            continue
+
+        item_distance = distance(item)
+        is_duplicate = any(
+            abs(item_distance - distance(items[kept_index])) <= max_distance_gap
+            and estimate_jaccard(
+                signature_of(index, text),
+                signature_of(kept_index, content(items[kept_index])),
+            )
+            >= threshold
+            for kept_index in kept_indices
+        )
+        if is_duplicate:
+            continue
+
+        kept.append(item)
+        kept_indices.append(index)
+        kept_hashes.add(digest)
+
+    return kept
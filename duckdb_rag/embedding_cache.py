@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+from .database import VECTOR_DIMENSION
+
+# キャッシュに保持するエントリ数のデフォルト上限（2048次元で約8KB/件）
+DEFAULT_MAX_ENTRIES = 100_000
+
+# 1つのクエリで照合するキーの数（SQLiteのパラメータ数の上限を超えないようにする）
+_KEY_CHUNK_SIZE = 500
+
+# 他のプロセスが書き込み中の場合に待つ時間（秒）
+_BUSY_TIMEOUT = 30.0
+
+
+def embedding_key(content: str) -> str:
+    """埋め込みキャッシュのキーとなる内容のSHA-256ハッシュを返す
+
+    埋め込みは空白の違いでも変わるため、正規化せずにそのままハッシュする。
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """内容のハッシュとモデル名をキーにドキュメントの埋め込みを保存する
+
+    WALモードのSQLiteデータベースファイルに保存するため、main.py と複数の
+    サーバープロセスが同じファイルを同時に開いて共有できる。
+    ファイルが移動・改名されても内容が同じであればキャッシュが使われる。
+    エントリ数が上限を超えると最後に使われた時刻が古いものから削除する。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_name: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        vector_dimension: int = VECTOR_DIMENSION,
+    ):
+        """
+        Args:
+            path: キャッシュを保存するSQLiteデータベースファイルのパス
+            model_name: 埋め込みに使用するモデル名
+            max_entries: 保持するエントリ数の上限
+            vector_dimension: ベクトルの次元数
+        """
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.vector_dimension = vector_dimension
+        self.hits = 0
+        self.misses = 0
+
+        # サーバーは埋め込みをワーカースレッドで計算するため、
+        # 接続をスレッド間で共有し、ロックで1つずつ実行する
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=_BUSY_TIMEOUT, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    content_hash TEXT,
+                    model_name TEXT,
+                    vector BLOB,
+                    last_used REAL,
+                    PRIMARY KEY (content_hash, model_name)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embedding_cache_last_used "
+                "ON embedding_cache (last_used)"
+            )
+        logging.info(f"Opened embedding cache '{path}' ({len(self)} entries)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def _count(self) -> int:
+        row = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+        return int(row[0]) if row is not None else 0
+
+    def get_many(self, contents: list[str]) -> dict[str, list[float]]:
+        """キャッシュ済みの埋め込みを取得する
+
+        Args:
+            contents: ドキュメントのテキスト内容のリスト
+
+        Returns:
+            dict[str, list[float]]: キャッシュにあった内容のキーと埋め込み
+        """
+        keys = list({embedding_key(content) for content in contents})
+        if not keys:
+            return {}
+
+        found: dict[str, list[float]] = {}
+        with self._lock, self._conn:
+            for start in range(0, len(keys), _KEY_CHUNK_SIZE):
+                chunk = keys[start : start + _KEY_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT content_hash, vector FROM embedding_cache "
+                    f"WHERE model_name = ? AND content_hash IN ({placeholders})",
+                    [self.model_name, *chunk],
+                ).fetchall()
+                found.update(
+                    (key, np.frombuffer(vector, dtype=np.float32).tolist())
+                    for key, vector in rows
+                )
+            self._conn.executemany(
+                "UPDATE embedding_cache SET last_used = ? "
+                "WHERE content_hash = ? AND model_name = ?",
+                [(time.time(), key, self.model_name) for key in found],
+            )
+
+        self.hits += sum(1 for c in contents if embedding_key(c) in found)
+        self.misses += sum(1 for c in contents if embedding_key(c) not in found)
+        return found
+
+    def put_many(self, contents: list[str], vectors: list[list[float]]) -> None:
+        """埋め込みを保存し、上限を超えた古いエントリを削除する
+
+        Args:
+            contents: ドキュメントのテキスト内容のリスト
+            vectors: 埋め込みのリスト（contentsと同じ順序）
+        """
+        for vector in vectors:
+            if len(vector) != self.vector_dimension:
+                raise ValueError(
+                    f"Expected {self.vector_dimension}-dimensional vectors, "
+                    f"got {len(vector)}"
+                )
+        now = time.time()
+        rows = [
+            (
+                embedding_key(content),
+                self.model_name,
+                np.asarray(vector, dtype=np.float32).tobytes(),
+                now,
+            )
+            for content, vector in zip(contents, vectors)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?)", rows
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """上限を超えた分のエントリを最後に使われた時刻が古い順に削除する
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        with self._lock, self._conn:
+            excess = self._count() - self.max_entries
+            if excess <= 0:
+                return 0
+            self._conn.execute(
+                """
+                DELETE FROM embedding_cache WHERE rowid IN (
+                    SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?
+                )
+                """,
+                [excess],
+            )
+        logging.info(f"Evicted {excess} entries from embedding cache")
+        return excess
+
+    def stats(self) -> dict[str, Any]:
+        """キャッシュの統計情報を返す"""
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        """キャッシュのデータベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
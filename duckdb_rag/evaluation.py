@@ -0,0 +1,247 @@
+import json
+import logging
+import math
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from .benchmark import summarize_latency
+from .database import search_document_ids
+from .mmap_store import MmapVectorStore
+
+# 検索バックエンド: (クエリベクトル, 件数) -> 距離の昇順に並んだドキュメントID
+SearchBackend = Callable[[list[float], int], list[int]]
+
+# クエリごとの正解: ドキュメントID -> 関連度（二値評価なら 1.0）
+Relevance = dict[int, float]
+
+# 全件検索による正解: 距離の昇順に並んだドキュメントID
+Ranking = list[int]
+
+DEFAULT_KS = (1, 5, 10)
+
+
+def recall_at_k(retrieved: list[int], relevant: Relevance, k: int) -> float:
+    """正解のうち上位k件に含まれるものの割合
+
+    正解が k 件より多い場合は 1.0 に達しない。
+
+    Args:
+        retrieved: 検索結果のドキュメントID（順位順）
+        relevant: 正解のドキュメントIDと関連度
+        k: 評価する件数
+
+    Returns:
+        float: recall@k（正解がなければ 0.0）
+    """
+    if not relevant:
+        return 0.0
+    hits = sum(1 for doc_id in retrieved[:k] if doc_id in relevant)
+    return hits / len(relevant)
+
+
+def reciprocal_rank(retrieved: list[int], relevant: Relevance) -> float:
+    """最初に現れた正解の順位の逆数
+
+    Args:
+        retrieved: 検索結果のドキュメントID（順位順）
+        relevant: 正解のドキュメントIDと関連度
+
+    Returns:
+        float: 逆順位（正解が含まれなければ 0.0）
+    """
+    for rank, doc_id in enumerate(retrieved, start=1):
+        if doc_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(retrieved: list[int], relevant: Relevance, k: int) -> float:
+    """関連度を考慮した上位k件の正規化割引累積利得
+
+    Args:
+        retrieved: 検索結果のドキュメントID（順位順）
+        relevant: 正解のドキュメントIDと関連度
+        k: 評価する件数
+
+    Returns:
+        float: nDCG@k（正解がなければ 0.0）
+    """
+    dcg = sum(
+        relevant.get(doc_id, 0.0) / math.log2(rank + 1)
+        for rank, doc_id in enumerate(retrieved[:k], start=1)
+    )
+    ideal = sorted(relevant.values(), reverse=True)[:k]
+    idcg = sum(grade / math.log2(rank + 1) for rank, grade in enumerate(ideal, start=1))
+    return dcg / idcg if idcg > 0 else 0.0
+
+
+def duckdb_backend(conn: Any) -> SearchBackend:
+    """array_cosine_distance で検索するDuckDBのバックエンドを作成する
+
+    インデックスがなければ全件検索、HNSWインデックスがあれば近似検索になる。
+
+    Args:
+        conn: DuckDB接続
+
+    Returns:
+        SearchBackend: 検索関数
+    """
+
+    def search(vector: list[float], limit: int) -> list[int]:
+        return [doc_id for doc_id, _ in search_document_ids(conn, vector, limit)]
+
+    return search
+
+
+def mmap_backend(store: MmapVectorStore) -> SearchBackend:
+    """メモリマップしたサイドカーをnumpyで全件検索するバックエンドを作成する
+
+    Args:
+        store: MmapVectorStore
+
+    Returns:
+        SearchBackend: 検索関数
+    """
+
+    def search(vector: list[float], limit: int) -> list[int]:
+        return [doc_id for doc_id, _ in store.search_ids(vector, limit)]
+
+    return search
+
+
+def ranking_relevance(ranking: Ranking, k: int) -> Relevance:
+    """全件検索の上位k件を、順位が高いほど関連度が大きい正解に変換する
+
+    Args:
+        ranking: 全件検索の結果のドキュメントID（順位順）
+        k: 正解とする件数
+
+    Returns:
+        Relevance: 1位が k、k位が 1 の関連度
+    """
+    return {doc_id: float(k - rank) for rank, doc_id in enumerate(ranking[:k])}
+
+
+def exact_ground_truth(conn: Any, queries: list[list[float]], k: int) -> list[Ranking]:
+    """全件検索の上位k件を順位付きの正解とする
+
+    近似検索の精度を測るための基準で、HNSWインデックスなどを作成する前の
+    接続で計算する必要がある。評価では各 k について全件検索の上位 k 件を
+    正解とし、nDCG は全件検索の順位を関連度として扱う。
+
+    Args:
+        conn: DuckDB接続
+        queries: クエリベクトルのリスト
+        k: 正解とする件数
+
+    Returns:
+        list[Ranking]: クエリごとの全件検索の結果
+    """
+    search = duckdb_backend(conn)
+    return [search(query, k) for query in queries]
+
+
+def load_labeled_queries(path: str) -> tuple[list[str], list[Relevance]]:
+    """正解付きクエリをJSON Linesファイルから読み込む
+
+    各行は {"query": "...", "relevant": [1, 2]} または
+    {"query": "...", "relevant": {"1": 3, "2": 1}}（段階的な関連度）の形式。
+
+    Args:
+        path: JSON Linesファイルのパス
+
+    Returns:
+        tuple[list[str], list[Relevance]]: クエリ文字列と正解のリスト
+    """
+    queries: list[str] = []
+    relevances: list[Relevance] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            relevant = record["relevant"]
+            if isinstance(relevant, dict):
+                relevance = {int(k): float(v) for k, v in relevant.items()}
+            else:
+                relevance = {int(doc_id): 1.0 for doc_id in relevant}
+            queries.append(record["query"])
+            relevances.append(relevance)
+    return queries, relevances
+
+
+def evaluate_backend(
+    search: SearchBackend,
+    queries: list[list[float]],
+    relevances: Sequence[Relevance | Ranking],
+    ks: tuple[int, ...] = DEFAULT_KS,
+) -> dict[str, float]:
+    """1つのバックエンドの検索精度とレイテンシを計測する
+
+    正解が全件検索の順位（Ranking）の場合、recall@k と nDCG@k は全件検索の
+    上位 k 件に対して、MRR は全件検索の1位に対して計算する。
+
+    Args:
+        search: 検索バックエンド
+        queries: クエリベクトルのリスト
+        relevances: クエリごとの正解（queriesと同じ順序）
+        ks: recall と nDCG を計算する件数
+
+    Returns:
+        dict[str, float]: recall@k, ndcg@k, mrr とレイテンシ（ミリ秒）
+    """
+    if len(queries) != len(relevances):
+        raise ValueError("queries and relevances must have the same length")
+
+    limit = max(ks)
+    # 初回実行のコストを除くためのウォームアップ
+    search(queries[0], limit)
+
+    seconds = []
+    totals: dict[str, float] = {}
+    for query, relevant in zip(queries, relevances):
+        start = time.perf_counter()
+        retrieved = search(query, limit)
+        seconds.append(time.perf_counter() - start)
+
+        if isinstance(relevant, list):
+            scores = {"mrr": reciprocal_rank(retrieved, ranking_relevance(relevant, 1))}
+            for k in ks:
+                relevant_k = ranking_relevance(relevant, k)
+                scores[f"recall@{k}"] = recall_at_k(retrieved, relevant_k, k)
+                scores[f"ndcg@{k}"] = ndcg_at_k(retrieved, relevant_k, k)
+        else:
+            scores = {"mrr": reciprocal_rank(retrieved, relevant)}
+            for k in ks:
+                scores[f"recall@{k}"] = recall_at_k(retrieved, relevant, k)
+                scores[f"ndcg@{k}"] = ndcg_at_k(retrieved, relevant, k)
+        for name, score in scores.items():
+            totals[name] = totals.get(name, 0.0) + score
+
+    report = {name: round(total / len(queries), 4) for name, total in totals.items()}
+    return {**report, **summarize_latency(seconds)}
+
+
+def evaluate_backends(
+    backends: dict[str, SearchBackend],
+    queries: list[list[float]],
+    relevances: Sequence[Relevance | Ranking],
+    ks: tuple[int, ...] = DEFAULT_KS,
+) -> dict[str, dict[str, float]]:
+    """複数のバックエンドを同じクエリと正解で評価して並べる
+
+    Args:
+        backends: バックエンド名と検索関数（挿入順に評価する）
+        queries: クエリベクトルのリスト
+        relevances: クエリごとの正解
+        ks: recall と nDCG を計算する件数
+
+    Returns:
+        dict[str, dict[str, float]]: バックエンドごとの評価結果
+    """
+    results = {}
+    for name, search in backends.items():
+        logging.info(f"Evaluating backend '{name}' on {len(queries)} queries")
+        results[name] = evaluate_backend(search, queries, relevances, ks)
+    return results
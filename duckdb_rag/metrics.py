@@ -0,0 +1,276 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# 検索処理の計測ステージ
+SEARCH_STAGES = (
+    "tokenize",
+    "forward",
+    "to_list",
+    "query",
+    "collapse",
+    "response",
+    "total",
+)
+
+# パーセンタイルを計算する直近の観測数
+DEFAULT_WINDOW = 1024
+
+# QPSを計算する時間窓（秒）
+DEFAULT_RATE_WINDOW = 60.0
+
+_tokenize_state = threading.local()
+
+
+def take_tokenize_seconds() -> float:
+    """現在のスレッドで計測されたトークナイズ時間を取得してリセットする
+
+    Returns:
+        float: 前回の呼び出し以降にトークナイザー内で費やされた秒数
+    """
+    seconds = getattr(_tokenize_state, "seconds", 0.0)
+    _tokenize_state.seconds = 0.0
+    return seconds
+
+
+class TimedTokenizer:
+    """トークナイザーの呼び出し時間を計測するラッパー
+
+    モデルの encode_query はトークナイズと推論を一度に行うため、
+    トークナイザーをラップしてその中で費やされた時間を記録し、
+    推論時間と分けて計測できるようにする。その他の属性はそのまま委譲する。
+    """
+
+    _TIMED_METHODS = frozenset(
+        {"encode", "encode_plus", "batch_encode_plus", "tokenize", "pad"}
+    )
+
+    def __init__(self, tokenizer: Any):
+        self._tokenizer = tokenizer
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._timed(self._tokenizer, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._tokenizer, name)
+        if name in self._TIMED_METHODS and callable(attr):
+            return lambda *args, **kwargs: self._timed(attr, *args, **kwargs)
+        return attr
+
+    @staticmethod
+    def _timed(func: Any, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _tokenize_state.seconds = getattr(_tokenize_state, "seconds", 0.0) + elapsed
+
+
+class StageTimer:
+    """1回の処理のステージごとの所要時間を記録する"""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+        self._started_at = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """with ブロック内の所要時間をステージ name として記録する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        """ステージの所要時間を加算する"""
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def finish(self) -> dict[str, float]:
+        """全体の所要時間を total として記録し、結果を返す"""
+        self.seconds["total"] = time.perf_counter() - self._started_at
+        return self.seconds
+
+
+class LatencyHistogram:
+    """直近の観測値からパーセンタイルを計算するローリングヒストグラム"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._values: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """観測値を追加する"""
+        self._values.append(seconds)
+        self.count += 1
+        self.sum += seconds
+
+    def percentiles(self) -> dict[str, float]:
+        """p50/p95/p99 を秒単位で返す（観測がなければ空）"""
+        values = sorted(self._values)
+        if not values:
+            return {}
+        return {
+            name: values[min(len(values) - 1, int(q * len(values)))]
+            for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        }
+
+
+class RateCounter:
+    """一定の時間窓内のイベント数から毎秒のレートを計算する"""
+
+    def __init__(self, window: float = DEFAULT_RATE_WINDOW):
+        self.window = window
+        self._timestamps: deque[float] = deque()
+        self.total = 0
+
+    def mark(self, now: float | None = None) -> None:
+        """イベントを1件記録する"""
+        now = time.monotonic() if now is None else now
+        self._timestamps.append(now)
+        self.total += 1
+        self._expire(now)
+
+    def rate(self, now: float | None = None) -> float:
+        """時間窓内の毎秒イベント数"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        return len(self._timestamps) / self.window
+
+    def _expire(self, now: float) -> None:
+        while self._timestamps and self._timestamps[0] < now - self.window:
+            self._timestamps.popleft()
+
+
+class SearchMetrics:
+    """検索のステージ別レイテンシとQPSを集計する"""
+
+    def __init__(
+        self, window: int = DEFAULT_WINDOW, rate_window: float = DEFAULT_RATE_WINDOW
+    ):
+        self.stages = {stage: LatencyHistogram(window) for stage in SEARCH_STAGES}
+        self.requests = RateCounter(rate_window)
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: dict[str, float]) -> None:
+        """1回の検索のステージ別所要時間を記録する"""
+        with self._lock:
+            for stage, value in seconds.items():
+                if stage in self.stages:
+                    self.stages[stage].observe(value)
+            self.requests.mark()
+
+    def record_error(self) -> None:
+        """失敗した検索を記録する"""
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """現在の集計値をミリ秒単位の辞書として返す"""
+        with self._lock:
+            latency_ms = {
+                stage: {
+                    name: round(value * 1000, 3)
+                    for name, value in histogram.percentiles().items()
+                }
+                for stage, histogram in self.stages.items()
+            }
+            return {
+                "search_count": self.requests.total,
+                "search_errors": self.errors,
+                "qps": round(self.requests.rate(), 3),
+                "latency_ms": latency_ms,
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheusのテキスト形式で集計値を出力する"""
+        lines = [
+            "# HELP rag_search_latency_seconds Search latency by stage.",
+            "# TYPE rag_search_latency_seconds summary",
+        ]
+        with self._lock:
+            for stage, histogram in self.stages.items():
+                for name, value in histogram.percentiles().items():
+                    quantile = int(name[1:]) / 100
+                    lines.append(
+                        f'rag_search_latency_seconds{{stage="{stage}",'
+                        f'quantile="{quantile}"}} {value:.6f}'
+                    )
+                lines.append(
+                    f'rag_search_latency_seconds_sum{{stage="{stage}"}} '
+                    f"{histogram.sum:.6f}"
+                )
+                lines.append(
+                    f'rag_search_latency_seconds_count{{stage="{stage}"}} '
+                    f"{histogram.count}"
+                )
+            lines += [
+                "# HELP rag_search_requests_total Completed searches.",
+                "# TYPE rag_search_requests_total counter",
+                f"rag_search_requests_total {self.requests.total}",
+                "# HELP rag_search_errors_total Failed searches.",
+                "# TYPE rag_search_errors_total counter",
+                f"rag_search_errors_total {self.errors}",
+                "# HELP rag_search_qps Searches per second over the rate window.",
+                "# TYPE rag_search_qps gauge",
+                f"rag_search_qps {self.requests.rate():.6f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(metrics: SearchMetrics, path: str) -> None:
+    """Prometheusテキスト形式の集計値をファイルへ原子的に書き出す
+
+    Args:
+        metrics: 書き出す集計値
+        path: 出力ファイルパス（node_exporter の textfile collector など）
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(metrics.render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def start_metrics_server(
+    metrics: SearchMetrics, port: int, host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """/metrics でPrometheusテキスト形式を返すHTTPサーバーを起動する
+
+    Args:
+        metrics: 公開する集計値
+        port: 待ち受けポート
+        host: 待ち受けアドレス
+
+    Returns:
+        ThreadingHTTPServer: 起動したサーバー（shutdown() で停止する）
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # アクセスログでサーバーのログを埋めないよう出力しない
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,319 @@
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import time
+from typing import Any
+
+import duckdb
+import numpy as np
+
+from .database import (
+    VECTOR_DIMENSION,
+    read_parquet_metadata,
+    validate_parquet_metadata,
+)
+
+# サイドカーを構成するファイル名
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.npy"
+OFFSETS_FILE = "offsets.npy"
+CONTENTS_FILE = "contents.bin"
+METADATA_FILE = "metadata.json"
+
+# 書き出しごとのファイルを置くサブディレクトリと、その中のバージョン名
+VERSIONS_DIR = "versions"
+_VERSION_NAME = re.compile(r"v\d+")
+
+MMAP_DTYPES = ("float32", "float16")
+
+# 書き出し・検索で一度に処理する行数（float32で約64MB）
+DEFAULT_CHUNK_ROWS = 8192
+
+
+def default_mmap_directory(parquet_path: str) -> str:
+    """Parquetファイルに対応するサイドカーのディレクトリパスを返す
+
+    例: vectors.parquet -> vectors.mmap
+    """
+    return os.path.splitext(parquet_path)[0] + ".mmap"
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """各行をL2ノルムで正規化する（ゼロベクトルはそのまま）"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _replace_file(tmp_path: str, path: str) -> None:
+    # 古いファイルをmmap中のプロセスは置き換え前の内容を読み続けられる
+    os.replace(tmp_path, path)
+
+
+def _read_metadata(directory: str) -> dict[str, Any] | None:
+    """サイドカーのメタデータを読み込む（存在しなければ None）"""
+    try:
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _remove_old_versions(directory: str, keep: set[str]) -> None:
+    """versions/ 内の keep 以外のバージョンのディレクトリを削除する
+
+    出力先には任意のディレクトリを指定できるため、versions/ の外や
+    バージョン名の形式に一致しないものには触れない。
+    """
+    versions_dir = os.path.join(directory, VERSIONS_DIR)
+    for name in os.listdir(versions_dir):
+        path = os.path.join(versions_dir, name)
+        if _VERSION_NAME.fullmatch(name) and name not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def export_mmap_store(
+    parquet_path: str,
+    directory: str | None = None,
+    dtype: str = "float32",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> int:
+    """Parquetファイルからメモリマップ用のサイドカーを書き出す
+
+    ベクトルはコサイン距離を内積だけで計算できるよう正規化した
+    (ドキュメント数, 次元数) の行列として .npy に、本文はUTF-8で連結した
+    contents.bin と各ドキュメントの開始位置 offsets.npy に保存する。
+    ファイルは versions/ 内の新しいバージョンのディレクトリに書き出し、最後に
+    metadata.json を置き換えて参照先のバージョンを切り替える。読み込み側は
+    metadata.json が指すバージョンのファイルだけを開くため、書き出し中でも
+    古いバージョンと新しいバージョンのファイルが混ざることはない。
+    直前のバージョンは開いている途中のプロセスのために残し、それより古い
+    バージョンは削除する。
+
+    Args:
+        parquet_path: 読み込むParquetファイルのパス
+        directory: 出力先のディレクトリ（省略時は default_mmap_directory）
+        dtype: ベクトルの型（float32 または float16）
+        chunk_rows: 一度に読み込む行数
+
+    Returns:
+        int: 書き出したドキュメント数
+    """
+    if dtype not in MMAP_DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    directory = directory or default_mmap_directory(parquet_path)
+    os.makedirs(directory, exist_ok=True)
+    previous = _read_metadata(directory)
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(directory, VERSIONS_DIR, version)
+    os.makedirs(version_dir)
+
+    start = time.perf_counter()
+    conn = duckdb.connect()
+    try:
+        metadata = read_parquet_metadata(conn, parquet_path)
+        validate_parquet_metadata(metadata)
+        source = f"read_parquet('{parquet_path}')"
+        fetch_result = conn.sql(f"SELECT COUNT(*) FROM {source}").fetchone()
+        count = int(fetch_result[0]) if fetch_result is not None else 0
+
+        path = {
+            name: os.path.join(version_dir, name)
+            for name in (VECTORS_FILE, IDS_FILE, OFFSETS_FILE, CONTENTS_FILE)
+        }
+        vectors = np.lib.format.open_memmap(
+            path[VECTORS_FILE],
+            mode="w+",
+            dtype=dtype,
+            shape=(count, VECTOR_DIMENSION),
+        )
+        ids = np.empty(count, dtype=np.int64)
+        offsets = np.zeros(count + 1, dtype=np.int64)
+
+        # idの昇順にキーセットページングで読み込む
+        row = 0
+        last_id = None
+        with open(path[CONTENTS_FILE], "wb") as contents:
+            while row < count:
+                where = "" if last_id is None else f"WHERE id > {last_id}"
+                chunk = conn.sql(
+                    f"SELECT id, content, vector FROM {source} {where} "
+                    f"ORDER BY id LIMIT {chunk_rows}"
+                ).fetchnumpy()
+                n = len(chunk["id"])
+                if n == 0:
+                    break
+
+                matrix = np.stack(list(chunk["vector"])).astype(np.float32)
+                vectors[row : row + n] = _normalize_rows(matrix)
+                ids[row : row + n] = chunk["id"]
+                for i, content in enumerate(chunk["content"]):
+                    encoded = content.encode("utf-8")
+                    contents.write(encoded)
+                    offsets[row + i + 1] = offsets[row + i] + len(encoded)
+
+                row += n
+                last_id = int(chunk["id"][-1])
+
+        vectors.flush()
+        del vectors
+        np.save(path[IDS_FILE], ids)
+        np.save(path[OFFSETS_FILE], offsets)
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+    finally:
+        conn.close()
+
+    # メタデータは最後に書き、参照するバージョンを原子的に切り替える
+    store_metadata = {
+        "version": version,
+        "vector_dimension": VECTOR_DIMENSION,
+        "model_name": metadata.get("model_name"),
+        "document_count": count,
+        "dtype": dtype,
+        "normalized": True,
+        "source": os.path.abspath(parquet_path),
+    }
+    metadata_path = os.path.join(directory, METADATA_FILE)
+    with open(f"{metadata_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(store_metadata, f, ensure_ascii=False, indent=2)
+    _replace_file(f"{metadata_path}.tmp", metadata_path)
+
+    keep = {version}
+    if previous is not None and previous.get("version"):
+        keep.add(previous["version"])
+    _remove_old_versions(directory, keep)
+
+    logging.info(
+        f"Exported {count} vectors to '{directory}' ({dtype}) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return count
+
+
+class MmapVectorStore:
+    """export_mmap_store で書き出したサイドカーをメモリマップで読み込む
+
+    ファイルはmmapするだけで読み込まないため、起動時間はドキュメント数に
+    依存せず、同じファイルを開いた複数のプロセスはページキャッシュを共有する。
+    読み取り専用で、ドキュメントの追加・更新・削除はできない。
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: サイドカーのディレクトリパス
+        """
+        self.directory = directory
+        self.metadata_path = os.path.join(directory, METADATA_FILE)
+        with open(self.metadata_path, encoding="utf-8") as f:
+            self.metadata: dict[str, Any] = json.load(f)
+
+        # metadata.json が指すバージョンのファイルだけを開く
+        data_dir = os.path.join(directory, VERSIONS_DIR, self.metadata["version"])
+        self.vectors = np.load(os.path.join(data_dir, VECTORS_FILE), mmap_mode="r")
+        self.ids = np.load(os.path.join(data_dir, IDS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(data_dir, OFFSETS_FILE), mmap_mode="r")
+        contents_path = os.path.join(data_dir, CONTENTS_FILE)
+        self._validate(os.path.getsize(contents_path))
+
+        # 空ファイルはmmapできないため、本文がない場合は空のバイト列を使う
+        # （ファイルは close() で閉じる）
+        self._contents_file = open(contents_path, "rb")  # noqa: SIM115
+        self._contents: Any = b""
+        if os.fstat(self._contents_file.fileno()).st_size > 0:
+            self._contents = mmap.mmap(
+                self._contents_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        logging.info(f"Memory-mapped {len(self)} vectors from '{directory}'")
+
+    def _validate(self, contents_size: int) -> None:
+        """ベクトル・ID・本文のファイルが同じ書き出しのものか確認する"""
+        count = len(self.ids)
+        if count != self.metadata["document_count"]:
+            raise ValueError(
+                f"{IDS_FILE} has {count} documents, metadata says "
+                f"{self.metadata['document_count']}"
+            )
+        if self.vectors.shape != (count, VECTOR_DIMENSION):
+            raise ValueError(
+                f"Vector matrix shape {self.vectors.shape} does not match "
+                f"{count} documents of dimension {VECTOR_DIMENSION}"
+            )
+        if len(self.offsets) != count + 1 or int(self.offsets[-1]) != contents_size:
+            raise ValueError(
+                f"{OFFSETS_FILE} does not match {CONTENTS_FILE} ({contents_size} bytes)"
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def content(self, index: int) -> str:
+        """行番号 index のドキュメントの本文を返す"""
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self._contents[start:end].decode("utf-8")
+
+    def search_indices(
+        self, vector: list[float], limit: int
+    ) -> list[tuple[int, float]]:
+        """クエリとのコサイン距離が小さい順に (行番号, 距離) を返す
+
+        Args:
+            vector: クエリベクトル
+            limit: 返す件数
+
+        Returns:
+            list[tuple[int, float]]: 行番号とコサイン距離
+        """
+        count = len(self)
+        limit = min(limit, count)
+        if limit <= 0:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        # float16の行列もfloat32で計算するよう、チャンクごとに変換する
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, DEFAULT_CHUNK_ROWS):
+            chunk = self.vectors[start : start + DEFAULT_CHUNK_ROWS]
+            scores[start : start + len(chunk)] = chunk.astype(np.float32) @ query
+
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(1.0 - scores[i])) for i in top]
+
+    def search_ids(self, vector: list[float], limit: int) -> list[tuple[int, float]]:
+        """search_document_ids と同じ形式で (id, 距離) を返す"""
+        return [
+            (int(self.ids[i]), distance)
+            for i, distance in self.search_indices(vector, limit)
+        ]
+
+    def search(self, vector: list[float], limit: int) -> list[tuple[str, float, int]]:
+        """search_documents と同じ形式で (本文, 距離, id) を返す"""
+        return [
+            (self.content(i), distance, int(self.ids[i]))
+            for i, distance in self.search_indices(vector, limit)
+        ]
+
+    def get_documents(self, ids: list[int]) -> list[tuple[int, str]]:
+        """get_documents と同じ形式でIDを指定して (id, 本文) を返す"""
+        # idは昇順に書き出されているため二分探索で行番号を求める
+        documents = []
+        for doc_id in ids:
+            index = int(np.searchsorted(self.ids, doc_id))
+            if index < len(self) and self.ids[index] == doc_id:
+                documents.append((doc_id, self.content(index)))
+        return documents
+
+    def close(self) -> None:
+        """メモリマップを閉じる"""
+        if isinstance(self._contents, mmap.mmap):
+            self._contents.close()
+        self._contents_file.close()
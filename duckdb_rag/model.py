@@ -1,10 +1,18 @@
 import torch
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from transformers import AutoModel, AutoTokenizer
 
+if TYPE_CHECKING:
+    from .embedding_cache import EmbeddingCache
 
-def load_model(model_name: str = "pfnet/plamo-embedding-1b") -> tuple[Any, Any]:
+DEFAULT_MODEL_NAME = "pfnet/plamo-embedding-1b"
+
+# ドキュメントをまとめてエンコードする際のバッチサイズ
+DEFAULT_BATCH_SIZE = 10
+
+
+def load_model(model_name: str = DEFAULT_MODEL_NAME) -> tuple[Any, Any]:
     """モデルとトークナイザーをロードする
 
     Args:
@@ -43,6 +51,57 @@ def encode_document(model: Any, tokenizer: Any, documents: list[str]) -> torch.T
         return model.encode_document(documents, tokenizer)
 
 
+def embed_documents(
+    model: Any,
+    tokenizer: Any,
+    documents: list[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: "EmbeddingCache | None" = None,
+) -> list[list[float]]:
+    """ドキュメントをバッチ単位でベクトル化し、リストとして返す
+
+    キャッシュが指定された場合はキャッシュにないドキュメントだけをエンコードし、
+    その結果をキャッシュに保存する。
+
+    Args:
+        model: 埋め込みモデル
+        tokenizer: トークナイザー
+        documents: エンコードするドキュメントのリスト
+        batch_size: 1回のエンコードで処理するドキュメント数
+        cache: 埋め込みキャッシュ（任意）
+
+    Returns:
+        list[list[float]]: ドキュメントベクトルのリスト（documentsと同じ順序）
+    """
+    cached: dict[str, list[float]] = {}
+    targets = documents
+    if cache is not None:
+        from .embedding_cache import embedding_key
+
+        cached = cache.get_many(documents)
+        # 同じ内容が複数含まれていても1回だけエンコードする
+        targets = list(
+            dict.fromkeys(d for d in documents if embedding_key(d) not in cached)
+        )
+
+    vectors: list[list[float]] = []
+    for start in range(0, len(targets), batch_size):
+        embeddings = encode_document(
+            model, tokenizer, targets[start : start + batch_size]
+        )
+        vectors.extend(
+            embedding.cpu().squeeze().numpy().tolist() for embedding in embeddings
+        )
+
+    if cache is None:
+        return vectors
+
+    if targets:
+        cache.put_many(targets, vectors)
+        cached.update((embedding_key(d), vector) for d, vector in zip(targets, vectors))
+    return [cached[embedding_key(d)] for d in documents]
+
+
 def encode_query(model: Any, tokenizer: Any, query: str) -> torch.Tensor:
     """検索クエリをベクトル化する
 
@@ -0,0 +1,206 @@
+import datetime
+import glob
+import logging
+import os
+import shutil
+import tempfile
+import time
+from types import TracebackType
+from typing import Any
+
+import duckdb
+
+from .database import (
+    DEFAULT_COMPRESSION,
+    DEFAULT_ROW_GROUP_SIZE,
+    VECTOR_DIMENSION,
+    format_vector,
+    parquet_copy_options,
+)
+from .model import DEFAULT_MODEL_NAME
+
+DEFAULT_COLUMNS = ("id", "content", "vector")
+
+
+class ParquetVectorWriter:
+    """ベクトルをバッチ単位でParquetファイルへストリーミング書き出しする
+
+    バッチが完了するたびにその行を一時ディレクトリ内のパートファイルへ書き出し、
+    メモリ上には1バッチ分の行しか保持しない。close() で全パートを1つの
+    Parquetファイルへ行グループ単位で結合し、ベクトル次元数・モデル名・
+    作成統計をファイルのメタデータとして書き込む。
+    """
+
+    def __init__(
+        self,
+        parquet_path: str,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        compression: str = DEFAULT_COMPRESSION,
+        compression_level: int | None = None,
+        columns: tuple[str, ...] = DEFAULT_COLUMNS,
+        model_name: str = DEFAULT_MODEL_NAME,
+        vector_dimension: int = VECTOR_DIMENSION,
+    ):
+        """
+        Args:
+            parquet_path: 保存先のParquetファイルパス
+            row_group_size: 1つの行グループに含める行数
+            compression: 圧縮コーデック（zstd, snappy, gzip, lz4, uncompressed など）
+            compression_level: 圧縮レベル（zstdのみ有効）
+            columns: ファイル内の列の並び順（id, content, vector の並べ替え）
+            model_name: 埋め込みに使用したモデル名
+            vector_dimension: ベクトルの次元数
+        """
+        if sorted(columns) != sorted(DEFAULT_COLUMNS):
+            raise ValueError(
+                f"columns must be a permutation of {DEFAULT_COLUMNS}, got {columns}"
+            )
+
+        self.parquet_path = parquet_path
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.compression_level = compression_level
+        self.columns = columns
+        self.model_name = model_name
+        self.vector_dimension = vector_dimension
+
+        self._document_count = 0
+        self._batch_count = 0
+        self._content_bytes = 0
+        self._started_at = time.monotonic()
+        self._closed = False
+
+        # 最終ファイルと同じディレクトリに置くことで os.replace を原子的にする
+        output_dir = os.path.dirname(os.path.abspath(parquet_path))
+        self._parts_dir = tempfile.mkdtemp(prefix=".vectors-parts-", dir=output_dir)
+
+        self._conn: Any = duckdb.connect()
+        self._conn.sql(
+            "CREATE TABLE batch (id INTEGER, content TEXT, "
+            f"vector FLOAT[{vector_dimension}])"
+        )
+
+    @property
+    def document_count(self) -> int:
+        """これまでに書き出したドキュメント数"""
+        return self._document_count
+
+    def write_batch(self, contents: list[str], vectors: list[list[float]]) -> int:
+        """1バッチ分のドキュメントをパートファイルとして書き出す
+
+        Args:
+            contents: ドキュメントのテキスト内容のリスト
+            vectors: ドキュメントのベクトル表現のリスト（contentsと同じ順序）
+
+        Returns:
+            int: 書き出した行数
+        """
+        if self._closed:
+            raise RuntimeError("ParquetVectorWriter is already closed")
+        if len(contents) != len(vectors):
+            raise ValueError("contents and vectors must have the same length")
+        if not contents:
+            return 0
+
+        first_id = self._document_count + 1
+        # ベクトルは文字列として渡し、SQL側で配列にキャストする（format_vector 参照）
+        rows = [
+            (first_id + i, content, format_vector(vector))
+            for i, (content, vector) in enumerate(zip(contents, vectors))
+        ]
+        part_path = os.path.join(
+            self._parts_dir, f"part-{self._batch_count:06d}.parquet"
+        )
+
+        self._conn.executemany(
+            f"INSERT INTO batch VALUES (?, ?, ?::FLOAT[{self.vector_dimension}])", rows
+        )
+        self._conn.sql(
+            f"COPY (SELECT {', '.join(self.columns)} FROM batch) TO '{part_path}' "
+            + parquet_copy_options(
+                self.row_group_size, self.compression, self.compression_level
+            )
+        )
+        self._conn.sql("DELETE FROM batch")
+
+        self._document_count += len(rows)
+        self._batch_count += 1
+        self._content_bytes += sum(len(c.encode("utf-8")) for c in contents)
+        logging.info(
+            f"Wrote batch {self._batch_count} ({len(rows)} rows, "
+            f"{self._document_count} total)"
+        )
+        return len(rows)
+
+    def metadata(self) -> dict[str, str]:
+        """ファイルに書き込むメタデータを返す"""
+        return {
+            "vector_dimension": str(self.vector_dimension),
+            "model_name": self.model_name,
+            "document_count": str(self._document_count),
+            "batch_count": str(self._batch_count),
+            "content_bytes": str(self._content_bytes),
+            "row_group_size": str(self.row_group_size),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed_seconds": f"{time.monotonic() - self._started_at:.3f}",
+        }
+
+    def close(self) -> dict[str, str]:
+        """パートファイルを結合して最終的なParquetファイルを書き出す
+
+        Returns:
+            dict[str, str]: ファイルに書き込んだメタデータ
+        """
+        if self._closed:
+            raise RuntimeError("ParquetVectorWriter is already closed")
+
+        metadata = self.metadata()
+        tmp_path = f"{self.parquet_path}.tmp"
+        try:
+            options = parquet_copy_options(
+                self.row_group_size,
+                self.compression,
+                self.compression_level,
+                metadata,
+            )
+            if glob.glob(os.path.join(self._parts_dir, "*.parquet")):
+                source = f"read_parquet('{self._parts_dir}/*.parquet')"
+            else:
+                source = "batch"
+            self._conn.sql(
+                f"COPY (SELECT {', '.join(self.columns)} FROM {source}) "
+                f"TO '{tmp_path}' {options}"
+            )
+            os.replace(tmp_path, self.parquet_path)
+            logging.info(
+                f"Saved {self._document_count} vectors to '{self.parquet_path}'"
+            )
+            return metadata
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self._cleanup()
+
+    def abort(self) -> None:
+        """書き出しを中止し、一時ファイルを削除する"""
+        if not self._closed:
+            self._cleanup()
+
+    def _cleanup(self) -> None:
+        self._closed = True
+        self._conn.close()
+        shutil.rmtree(self._parts_dir, ignore_errors=True)
+
+    def __enter__(self) -> "ParquetVectorWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if exc_type is not None:
+            self.abort()
+        elif not self._closed:
+            self.close()
@@ -0,0 +1,103 @@
+import re
+
+# スニペットの長さのデフォルト値（文字数）
+DEFAULT_SNIPPET_CHARS = 300
+
+# 空行または見出しの直前で段落を区切る
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\n(?=#)")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def char_bigrams(text: str) -> set[str]:
+    """空白を除いて小文字化した文字bigramの集合を返す
+
+    日本語のように単語が空白で区切られない文章でも、クエリとの
+    語彙的な重なりを測れるよう文字単位で分割する。
+    """
+    normalized = _WHITESPACE.sub("", text).lower()
+    return {normalized[i : i + 2] for i in range(len(normalized) - 1)}
+
+
+def split_passages(text: str, max_chars: int = DEFAULT_SNIPPET_CHARS) -> list[str]:
+    """テキストを max_chars 以内のパッセージに分割する
+
+    段落（空行または見出しの区切り）を単位に、max_chars を超えない範囲で
+    連続する段落をまとめる。max_chars より長い段落は固定長で分割する。
+
+    Args:
+        text: ドキュメントのテキスト内容
+        max_chars: パッセージの最大文字数
+
+    Returns:
+        list[str]: パッセージのリスト（元の順序）
+    """
+    passages: list[str] = []
+    current = ""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + 2 + len(paragraph) <= max_chars:
+            current = f"{current}\n\n{paragraph}"
+            continue
+        if current:
+            passages.append(current)
+        # 長すぎる段落は固定長で分割し、最後の断片は次の段落とまとめられるようにする
+        while len(paragraph) > max_chars:
+            passages.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        current = paragraph
+    if current:
+        passages.append(current)
+    return passages
+
+
+def best_passage(text: str, query: str, max_chars: int = DEFAULT_SNIPPET_CHARS) -> str:
+    """クエリと最もよく一致するパッセージを抜き出す
+
+    クエリの文字bigramを多く含むパッセージを選ぶ。同点の場合は先頭に
+    近いものを優先し、一致がなければ最初のパッセージを返す。
+
+    Args:
+        text: ドキュメントのテキスト内容
+        query: 検索クエリ
+        max_chars: スニペットの最大文字数
+
+    Returns:
+        str: スニペット
+    """
+    if len(text) <= max_chars:
+        return text
+    passages = split_passages(text, max_chars)
+    if not passages:
+        return ""
+
+    query_bigrams = char_bigrams(query)
+    best, best_score = passages[0], 0
+    for passage in passages:
+        score = len(query_bigrams & char_bigrams(passage))
+        if score > best_score:
+            best, best_score = passage, score
+    return best
+
+
+def truncate_to_budget(texts: list[str], max_chars: int) -> list[str]:
+    """テキストの合計文字数が max_chars 以内になるよう順位順に切り詰める
+
+    上位のテキストから順に残りの予算まで使い、予算を使い切った後の
+    テキストは空文字列になる。
+
+    Args:
+        texts: 順位順のテキストのリスト
+        max_chars: 合計文字数の上限
+
+    Returns:
+        list[str]: 切り詰めたテキストのリスト
+    """
+    remaining = max(0, max_chars)
+    truncated = []
+    for text in texts:
+        truncated.append(text[:remaining])
+        remaining -= len(truncated[-1])
+    return truncated
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+
+class WriteBehindQueue:
+    """データベースへの変更をまとめて非同期に永続化する
+
+    変更のたびに mark_dirty() を呼び出すと、バックグラウンドタスクが
+    delay 秒待って変更をまとめてから flush を1回だけ実行する。
+    書き込みが集中しても永続化はまとめて行われるため、検索が
+    書き出し処理に待たされることはない。
+    """
+
+    def __init__(self, flush: Callable[[], Awaitable[None]], delay: float = 1.0):
+        """
+        Args:
+            flush: 変更を永続化するコルーチン関数
+            delay: 最初の変更から書き出しまでの待ち時間（秒）
+        """
+        self._flush = flush
+        self.delay = delay
+        self._dirty = asyncio.Event()
+        self._pending = 0
+        # discard() のたびに進め、書き出し中に破棄された変更を差し引かないようにする
+        self._generation = 0
+        self.flush_count = 0
+        self.last_flush_at: float | None = None
+        self.last_error: str | None = None
+
+    @property
+    def pending(self) -> int:
+        """まだ永続化されていない変更の数"""
+        return self._pending
+
+    def mark_dirty(self, changes: int = 1) -> None:
+        """変更があったことを記録し、書き出しを予約する
+
+        Args:
+            changes: 記録する変更の数
+        """
+        self._pending += changes
+        self._dirty.set()
+
+    def discard(self) -> int:
+        """保留中の変更を書き出さずに破棄する
+
+        Returns:
+            int: 破棄した変更の数
+        """
+        discarded = self._pending
+        self._pending = 0
+        self._generation += 1
+        self._dirty.clear()
+        if discarded:
+            logging.warning(f"Write-behind discarded {discarded} pending change(s)")
+        return discarded
+
+    async def run(self) -> None:
+        """変更を待ち受けて書き出すバックグラウンドループ"""
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(self.delay)
+            try:
+                await self.flush()
+            except Exception as e:
+                # 失敗した変更は次の書き出しで再試行する
+                self.last_error = str(e)
+                logging.error(f"Write-behind flush failed: {e}")
+                self._dirty.set()
+
+    async def flush(self) -> None:
+        """保留中の変更があれば直ちに書き出す"""
+        if self._pending == 0:
+            self._dirty.clear()
+            return
+
+        pending = self._pending
+        generation = self._generation
+        self._dirty.clear()
+        await self._flush()
+
+        # 書き出し中に追加された変更は次回に持ち越す。書き出し中に破棄された
+        # 場合は pending 分が既に差し引かれているため、残りは次回に書き出す
+        if generation == self._generation:
+            self._pending = max(0, self._pending - pending)
+        if self._pending > 0:
+            self._dirty.set()
+        self.flush_count += 1
+        self.last_flush_at = time.time()
+        self.last_error = None
+        logging.info(f"Write-behind flushed {pending} change(s)")
@@ -0,0 +1,151 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+import duckdb_rag as dr
+from duckdb_rag import benchmark, evaluation
+
+
+def sample_query_vectors(conn, count: int, seed: int) -> list[list[float]]:
+    """コーパスのドキュメントベクトルをクエリとして抽出する"""
+    rows = conn.sql(
+        f"SELECT vector FROM article USING SAMPLE {int(count)} ROWS "
+        f"(reservoir, {int(seed)})"
+    ).fetchall()
+    return [list(row[0]) for row in rows]
+
+
+def main():
+    # ロギング設定
+    dr.configure_logging()
+
+    # コマンドライン引数の設定
+    parser = argparse.ArgumentParser(description="DuckDB RAG 検索精度評価ツール")
+    parser.add_argument(
+        "--parquet",
+        type=str,
+        default=None,
+        help="評価するParquetファイルのパス（省略時は合成コーパスを使用）",
+    )
+    parser.add_argument(
+        "--labels",
+        type=str,
+        default=None,
+        help="正解付きクエリのJSON Linesファイル（省略時は全件検索の結果を正解とする）",
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        default="exact,hnsw",
+        help="評価する検索バックエンド（exact, hnsw, mmap のカンマ区切り）",
+    )
+    parser.add_argument(
+        "--k", type=str, default="1,5,10", help="recall と nDCG の件数（カンマ区切り）"
+    )
+    parser.add_argument(
+        "--queries", type=int, default=100, help="正解がない場合のクエリ数"
+    )
+    parser.add_argument(
+        "--synthetic-size", type=int, default=10000, help="合成コーパスのドキュメント数"
+    )
+    parser.add_argument(
+        "--distribution",
+        type=str,
+        default="clustered",
+        help="合成コーパスの分布（random, clustered）",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    parser.add_argument("--hnsw-m", type=int, default=16, help="HNSWの最大近傍数")
+    parser.add_argument(
+        "--hnsw-ef-construction", type=int, default=128, help="HNSW構築時の候補数"
+    )
+    parser.add_argument(
+        "--hnsw-ef-search", type=int, default=64, help="HNSW検索時の候補数"
+    )
+    parser.add_argument(
+        "--mmap-dtype",
+        type=str,
+        default="float32",
+        help="mmap バックエンドのベクトルの型（float32, float16）",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="evaluation_results.json",
+        help="結果を保存するJSONファイルのパス",
+    )
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    ks = tuple(int(k) for k in args.k.split(","))
+
+    # 評価対象のコーパスを読み込む
+    extensions = ("vss",) if "hnsw" in backends else ()
+    conn = dr.initialize_db(home_directory="/tmp", extensions=extensions)
+    work_dir = tempfile.TemporaryDirectory()
+    parquet_path = args.parquet
+    if parquet_path is None:
+        parquet_path = os.path.join(work_dir.name, "corpus.parquet")
+        benchmark.generate_corpus(
+            parquet_path, args.synthetic_size, args.distribution, args.seed
+        )
+    dr.load_vectors_from_parquet(conn, parquet_path)
+
+    # クエリと正解を用意する（HNSWインデックスを作成する前に計算する）
+    if args.labels:
+        texts, relevances = evaluation.load_labeled_queries(args.labels)
+        model, tokenizer = dr.load_model()
+        queries = [
+            dr.encode_query(model, tokenizer, text).cpu().squeeze().numpy().tolist()
+            for text in texts
+        ]
+    else:
+        if args.parquet is None:
+            queries = benchmark.generate_queries(
+                args.queries, args.distribution, args.seed
+            )
+        else:
+            queries = sample_query_vectors(conn, args.queries, args.seed)
+        relevances = evaluation.exact_ground_truth(conn, queries, max(ks))
+
+    # バックエンドごとに評価する（インデックスを作ると全件検索ではなくなるため exact を先に評価する）
+    results = {}
+    for backend in sorted(backends, key=lambda b: b != "exact"):
+        if backend == "exact":
+            search = evaluation.duckdb_backend(conn)
+        elif backend == "hnsw":
+            dr.create_hnsw_index(conn, args.hnsw_m, args.hnsw_ef_construction)
+            conn.sql(f"SET hnsw_ef_search = {args.hnsw_ef_search}")
+            search = evaluation.duckdb_backend(conn)
+        elif backend == "mmap":
+            mmap_directory = os.path.join(work_dir.name, "corpus.mmap")
+            dr.export_mmap_store(parquet_path, mmap_directory, args.mmap_dtype)
+            search = evaluation.mmap_backend(dr.MmapVectorStore(mmap_directory))
+        else:
+            raise ValueError(f"Unknown backend: {backend}")
+        results.update(
+            evaluation.evaluate_backends({backend: search}, queries, relevances, ks)
+        )
+
+    for backend, report in results.items():
+        logging.info(f"{backend}: {report}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "config": vars(args),
+                "document_count": dr.get_document_count(conn),
+                "results": results,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    logging.info(f"Evaluation results saved to '{args.output}'")
+    work_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import os
 import argparse
 import logging
-import torch
 
 import duckdb_rag as dr
 
@@ -24,11 +23,75 @@ def main():
         default="vectors.parquet",
         help="ベクトルを保存するParquetファイルのパス",
     )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=dr.DEFAULT_ROW_GROUP_SIZE,
+        help="Parquetの1行グループあたりの行数",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        default=dr.DEFAULT_COMPRESSION,
+        help="Parquetの圧縮コーデック（zstd, snappy, gzip, lz4, uncompressed）",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        default=None,
+        help="圧縮レベル（zstdのみ有効）",
+    )
+    parser.add_argument(
+        "--columns",
+        type=str,
+        default="id,content,vector",
+        help="Parquetファイル内の列の並び順（カンマ区切り）",
+    )
+    parser.add_argument(
+        "--dedup",
+        type=str,
+        choices=["none", "exact", "near"],
+        default="near",
+        help="重複ドキュメントの除外（none: しない, exact: 完全一致のみ, near: 近似重複も）",
+    )
+    parser.add_argument(
+        "--near-duplicate-threshold",
+        type=float,
+        default=0.9,
+        help="近似重複とみなす推定Jaccard類似度",
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        type=str,
+        default="embedding_cache.sqlite",
+        help="ドキュメント埋め込みのキャッシュファイルのパス",
+    )
+    parser.add_argument(
+        "--no-embedding-cache",
+        action="store_true",
+        help="埋め込みキャッシュを使わずに全ドキュメントをエンコードする",
+    )
+    parser.add_argument(
+        "--embedding-cache-size",
+        type=int,
+        default=dr.DEFAULT_CACHE_ENTRIES,
+        help="埋め込みキャッシュに保持するエントリ数の上限",
+    )
+    parser.add_argument(
+        "--mmap-export",
+        type=str,
+        choices=["none", "float32", "float16"],
+        default="none",
+        help="サーバーがメモリマップで読み込むサイドカーを書き出す際のベクトルの型",
+    )
+    parser.add_argument(
+        "--mmap-directory",
+        type=str,
+        default=None,
+        help="サイドカーの出力先ディレクトリ（省略時は Parquet と同じ名前の .mmap）",
+    )
     args = parser.parse_args()
 
-    # データベース初期化
-    conn = dr.initialize_db()
-
     # モデルを読み込む
     model, tokenizer = dr.load_model()
 
@@ -40,42 +103,80 @@ def main():
         return
     logging.info(f"Found {len(markdown_files)} markdown files")
 
-    # ドキュメントをバッチでベクトル化してDBに保存
+    # 重複ドキュメントはエンコードする前に除外する
+    deduplicator = None
+    if args.dedup != "none":
+        deduplicator = dr.DocumentDeduplicator(
+            args.near_duplicate_threshold if args.dedup == "near" else None
+        )
+
+    # 変更のないドキュメントは前回の埋め込みを再利用する
+    cache = None
+    if not args.no_embedding_cache:
+        cache = dr.EmbeddingCache(
+            args.embedding_cache,
+            dr.DEFAULT_MODEL_NAME,
+            max_entries=args.embedding_cache_size,
+        )
+
+    # ドキュメントをバッチでベクトル化し、バッチごとにParquetへ書き出す
     batch_size = 10  # 適切なバッチサイズ
     contents = []
 
-    for file_path in markdown_files:
-        doc = dr.load_markdown_file(file_path)
-        if doc:
-            contents.append(doc)
-
-            # バッチサイズに達したらエンコードして挿入
-            if len(contents) >= batch_size:
-                with torch.inference_mode():
-                    doc_embeddings = dr.encode_document(model, tokenizer, contents)
-                    doc_vectors = [
-                        embedding.cpu().squeeze().numpy().tolist()
-                        for embedding in doc_embeddings
-                    ]
-                    dr.add_documents_batch(conn, contents, doc_vectors)
-
-                # バッチをクリア
-                contents = []
-
-    # 残りのドキュメントを処理
-    if contents:
-        with torch.inference_mode():
-            doc_embeddings = dr.encode_document(model, tokenizer, contents)
-            doc_vectors = [
-                embedding.cpu().squeeze().numpy().tolist()
-                for embedding in doc_embeddings
-            ]
-            dr.add_documents_batch(conn, contents, doc_vectors)
-
-    # ベクトル化したデータをParquetとして保存
-    dr.save_vectors_to_parquet(conn, args.parquet)
+    with dr.ParquetVectorWriter(
+        args.parquet,
+        row_group_size=args.row_group_size,
+        compression=args.compression,
+        compression_level=args.compression_level,
+        columns=tuple(c.strip() for c in args.columns.split(",")),
+    ) as writer:
+        for file_path in markdown_files:
+            doc = dr.load_markdown_file(file_path)
+            if doc:
+                if deduplicator:
+                    duplicate = deduplicator.check(doc)
+                    if duplicate:
+                        logging.info(f"Skipped {duplicate} duplicate: {file_path}")
+                        continue
+                contents.append(doc)
+
+                # バッチサイズに達したらエンコードして書き出す
+                if len(contents) >= batch_size:
+                    write_batch(writer, model, tokenizer, contents, cache)
+
+                    # バッチをクリア
+                    contents = []
+
+        # 残りのドキュメントを処理
+        if contents:
+            write_batch(writer, model, tokenizer, contents, cache)
+
+    if cache is not None:
+        stats = cache.stats()
+        logging.info(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses")
+        cache.close()
+    if deduplicator:
+        logging.info(
+            f"Skipped {deduplicator.exact_duplicates} exact and "
+            f"{deduplicator.near_duplicates} near duplicates"
+        )
     logging.info(f"Vector data saved to '{args.parquet}'")
 
+    if args.mmap_export != "none":
+        dr.export_mmap_store(args.parquet, args.mmap_directory, args.mmap_export)
+
+
+def write_batch(
+    writer: dr.ParquetVectorWriter,
+    model,
+    tokenizer,
+    contents: list[str],
+    cache: dr.EmbeddingCache | None = None,
+) -> None:
+    """ドキュメントのバッチをベクトル化してParquetへ書き出す"""
+    doc_vectors = dr.embed_documents(model, tokenizer, contents, cache=cache)
+    writer.write_batch(contents, doc_vectors)
+
 
 if __name__ == "__main__":
     main()
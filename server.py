@@ -1,8 +1,10 @@
+import asyncio
+import functools
 import logging
 import os
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
-from typing import Any, AsyncIterator, cast
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Literal, cast
 
 from mcp.server.fastmcp import Context, FastMCP
 from pydantic import BaseModel
@@ -13,13 +15,379 @@ import duckdb_rag as dr
 class Document(BaseModel):
     content: str
     distance: float = 0.0
+    collection: str | None = None
+    id: int | None = None
+    # content が全文ではない（スニペット・切り詰め・ID のみ）かどうか
+    truncated: bool = False
+
+
+# search_documents のレスポンスの形式
+ResponseMode = Literal["full", "snippet", "ids"]
+
+
+# 重複をまとめる際に検索する件数の上限（limit に対する倍率）
+MAX_FETCH_MULTIPLIER = 8
+
+# VECTOR_COLLECTIONS を指定しない場合のコレクション名
+DEFAULT_COLLECTION = "default"
+
+# search_documents で全コレクションを検索する際の collection の値
+ALL_COLLECTIONS = "*"
+
+
+@dataclass
+class Collection:
+    """1つのParquetファイルから読み込んだコレクションの接続と書き出しの状態"""
+
+    name: str
+    conn: Any
+    vector_store: dr.MmapVectorStore | None = None
+    parquet_path: str = "vectors.parquet"
+    parquet_signature: tuple[int, int] | None = None
+    reload_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    write_queue: dr.WriteBehindQueue | None = None
 
 
 @dataclass
 class AppContext:
+    """全コレクションで共有するモデル・キャッシュ・メトリクスとコレクション
+
+    collections は指定順に保持し、最初のコレクションを既定のコレクションとする。
+    """
+
     model: Any
     tokenizer: Any
-    conn: Any
+    collections: dict[str, Collection]
+    embedding_cache: dr.EmbeddingCache | None = None
+    metrics: dr.SearchMetrics = field(default_factory=dr.SearchMetrics)
+
+    @property
+    def default_collection(self) -> Collection:
+        """collection を指定しない場合に使うコレクション"""
+        return next(iter(self.collections.values()))
+
+    @property
+    def conn(self) -> Any:
+        """既定のコレクションのDuckDB接続"""
+        return self.default_collection.conn
+
+
+def get_env_float(name: str, default: float) -> float:
+    """環境変数を数値として取得する（不正な値はデフォルト値として扱う）"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning(f"Invalid value for {name}: '{value}', using {default}")
+        return default
+
+
+def get_parquet_signature(parquet_path: str) -> tuple[int, int] | None:
+    """Parquetファイルの変更検知に使う (更新時刻, サイズ) を取得する"""
+    try:
+        stat = os.stat(parquet_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def parse_collections(spec: str | None, default_parquet: str) -> dict[str, str]:
+    """VECTOR_COLLECTIONS の設定からコレクション名とParquetファイルのパスを取得する
+
+    "名前=パス" をカンマ区切りで指定する。名前を省略した場合はファイル名
+    （拡張子を除く）を名前とする。未指定なら default_parquet だけを使う。
+
+    Args:
+        spec: VECTOR_COLLECTIONS の値
+        default_parquet: 未指定の場合に使うParquetファイルのパス
+
+    Returns:
+        dict[str, str]: コレクション名とParquetファイルのパス（指定順）
+    """
+    if not spec:
+        return {DEFAULT_COLLECTION: default_parquet}
+
+    collections: dict[str, str] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, path = entry.partition("=")
+        if not sep:
+            path = entry
+            name = os.path.splitext(os.path.basename(entry))[0]
+        name, path = name.strip(), path.strip()
+        if name in collections:
+            raise ValueError(f"Duplicate collection name: {name}")
+        collections[name] = path
+    if not collections:
+        raise ValueError("VECTOR_COLLECTIONS does not contain any collection")
+    return collections
+
+
+def get_collection(app_ctx: AppContext, name: str | None) -> Collection:
+    """名前からコレクションを取得する（None なら既定のコレクション）"""
+    if name is None:
+        return app_ctx.default_collection
+    if name in app_ctx.collections:
+        return app_ctx.collections[name]
+    raise ValueError(f"Unknown collection: {name}")
+
+
+def resolve_collections(app_ctx: AppContext, spec: str | None) -> list[Collection]:
+    """検索対象のコレクションを取得する
+
+    Args:
+        app_ctx: アプリケーションコンテキスト
+        spec: コレクション名、カンマ区切りの複数の名前、または "*"（全コレクション）
+
+    Returns:
+        list[Collection]: 検索対象のコレクション
+    """
+    if spec == ALL_COLLECTIONS:
+        return list(app_ctx.collections.values())
+    if spec is None:
+        return [app_ctx.default_collection]
+    names = list(dict.fromkeys(n.strip() for n in spec.split(",") if n.strip()))
+    return [get_collection(app_ctx, name) for name in names]
+
+
+def open_vector_db(parquet_path: str) -> Any:
+    """新しいDuckDB接続を作成し、Parquetファイルを読み込む"""
+    conn = dr.initialize_db(home_directory="/tmp")
+    try:
+        dr.load_vectors_from_parquet(conn, parquet_path)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+async def reload_vector_db(collection: Collection, force: bool = False) -> bool:
+    """Parquetファイルをシャドウ接続に読み込み、現在の接続と入れ替える
+
+    読み込みはバックグラウンドスレッドで行い、完了後にイベントループ上で
+    接続を差し替える。検索ツールは接続の取得から結果の取得までを
+    イベントループ上で同期的に実行するため、差し替えが実行中の検索と
+    交差することはなく、古い接続はそのまま閉じられる。
+
+    Args:
+        collection: 再読み込みするコレクション
+        force: ファイルが変更されていなくても読み込み直すかどうか
+
+    Returns:
+        bool: 接続を入れ替えたかどうか
+    """
+    if collection.vector_store is not None:
+        return reload_vector_store(collection, force)
+
+    async with collection.reload_lock:
+        signature = get_parquet_signature(collection.parquet_path)
+        if signature is None:
+            logging.warning(f"Parquet file '{collection.parquet_path}' not found")
+            return False
+        if not force and signature == collection.parquet_signature:
+            return False
+        if not force and has_pending_writes(collection):
+            logging.error(
+                f"Not reloading '{collection.parquet_path}': online changes have not "
+                "been written yet (use force to discard them)"
+            )
+            return False
+
+        logging.info(f"Reloading vectors from '{collection.parquet_path}'")
+        new_conn = await asyncio.to_thread(open_vector_db, collection.parquet_path)
+
+        # 読み込み中に行われた変更も入れ替えで失われるため、同様に扱う
+        if has_pending_writes(collection):
+            if not force:
+                new_conn.close()
+                logging.error(
+                    f"Not reloading '{collection.parquet_path}': documents were "
+                    "changed while loading"
+                )
+                return False
+            cast(dr.WriteBehindQueue, collection.write_queue).discard()
+
+        old_conn = collection.conn
+        collection.conn = new_conn
+        collection.parquet_signature = signature
+
+        try:
+            old_conn.close()
+        except Exception as e:
+            logging.error(f"Error closing previous database connection: {e}")
+        logging.info("Vector database reloaded")
+        return True
+
+
+def reload_vector_store(collection: Collection, force: bool = False) -> bool:
+    """サイドカーのメタデータが更新されていればメモリマップを開き直す
+
+    開き直しはファイルをmmapするだけなのでイベントループ上で行う。
+    """
+    store = cast(dr.MmapVectorStore, collection.vector_store)
+    signature = get_parquet_signature(store.metadata_path)
+    if signature is None:
+        logging.warning(f"Vector store '{store.directory}' not found")
+        return False
+    if not force and signature == collection.parquet_signature:
+        return False
+
+    collection.vector_store = dr.MmapVectorStore(store.directory)
+    collection.parquet_signature = signature
+    store.close()
+    logging.info("Memory-mapped vector store reloaded")
+    return True
+
+
+def has_pending_writes(collection: Collection) -> bool:
+    """Parquetファイルへまだ書き出していないオンラインの変更があるかどうか"""
+    return collection.write_queue is not None and collection.write_queue.pending > 0
+
+
+def require_writable(collection: Collection) -> None:
+    """読み取り専用のメモリマップバックエンドでの変更を拒否する"""
+    if collection.vector_store is not None:
+        raise RuntimeError("Documents cannot be modified with VECTOR_BACKEND=mmap")
+
+
+def save_vector_db(cursor: Any, parquet_path: str) -> None:
+    """DuckDBの内容をParquetファイルへ原子的に書き出す"""
+    tmp_path = f"{parquet_path}.tmp"
+    metadata = {
+        "vector_dimension": str(dr.VECTOR_DIMENSION),
+        "model_name": dr.DEFAULT_MODEL_NAME,
+        "document_count": str(dr.get_document_count(cursor)),
+    }
+    try:
+        if not dr.save_vectors_to_parquet(cursor, tmp_path, metadata=metadata):
+            raise RuntimeError(f"Failed to save vectors to '{parquet_path}'")
+        os.replace(tmp_path, parquet_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def flush_vector_db(collection: Collection) -> None:
+    """オンラインで行われた変更をParquetファイルへ書き出す
+
+    書き出しはバックグラウンドスレッドで別カーソルから行うため、
+    その間も検索や更新はイベントループ上で処理される。
+    書き出し中に接続が差し替えられないよう再読み込みのロックを保持する。
+    最後に読み込んだ後でファイルが差し替えられていた場合は、上書きせずに
+    エラーとする（変更は保留されたまま残る）。
+    """
+    async with collection.reload_lock:
+        if (
+            get_parquet_signature(collection.parquet_path)
+            != collection.parquet_signature
+        ):
+            logging.error(
+                f"Not writing changes: '{collection.parquet_path}' was replaced "
+                "since it was loaded (reload with force to discard the changes)"
+            )
+            raise RuntimeError(f"'{collection.parquet_path}' was modified externally")
+        cursor = collection.conn.cursor()
+        try:
+            await asyncio.to_thread(save_vector_db, cursor, collection.parquet_path)
+        finally:
+            cursor.close()
+        # 自身の書き出しを変更として再読み込みしないよう記録しておく
+        collection.parquet_signature = get_parquet_signature(collection.parquet_path)
+
+
+def get_document_count(collection: Collection) -> int:
+    """現在のバックエンドのドキュメント数を取得する"""
+    if collection.vector_store is not None:
+        return len(collection.vector_store)
+    return dr.get_document_count(collection.conn)
+
+
+def describe_vector_file(collection: Collection) -> str:
+    """コレクションが読み込んだファイルのパスと大きさ（mmapならディレクトリ）"""
+    if collection.vector_store is not None:
+        store = collection.vector_store
+        return f"{store.directory} (mmap, {store.metadata['dtype']})"
+
+    file_info = dr.get_file_info(collection.parquet_path)
+    if file_info["exists"]:
+        return f"{collection.parquet_path} ({file_info['size_mb']})"
+    return f"{collection.parquet_path} (not found)"
+
+
+async def dump_metrics_file(app_ctx: AppContext, path: str, interval: float) -> None:
+    """検索メトリクスを定期的にPrometheusテキスト形式で書き出す"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(dr.write_prometheus_file, app_ctx.metrics, path)
+        except Exception as e:
+            logging.error(f"Failed to write metrics file: {e}")
+
+
+async def watch_parquet_file(collection: Collection, interval: float) -> None:
+    """Parquetファイルの変更を定期的に確認し、変更があれば再読み込みする"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reload_vector_db(collection)
+        except Exception as e:
+            # 読み込みに失敗した場合は現在の接続を使い続ける
+            logging.error(f"Failed to reload vectors: {e}")
+
+
+def open_collection(name: str, parquet_path: str, use_mmap: bool) -> Collection:
+    """コレクションのParquetファイル（またはサイドカー）を読み込む
+
+    Args:
+        name: コレクション名
+        parquet_path: コレクションのParquetファイルのパス
+        use_mmap: Parquetを読み込まず、サイドカーをmmapするかどうか
+
+    Returns:
+        Collection: 読み込んだコレクション
+    """
+    logging.info(f"Opening collection '{name}' from '{parquet_path}'")
+    conn = None
+    vector_store = None
+    if use_mmap:
+        # Parquetを読み込まず、main.py --mmap-export で書き出したファイルをmmapする
+        mmap_directory = dr.default_mmap_directory(parquet_path)
+        if name == DEFAULT_COLLECTION:
+            mmap_directory = os.environ.get("VECTOR_MMAP_DIRECTORY") or mmap_directory
+        vector_store = dr.MmapVectorStore(mmap_directory)
+        signature = get_parquet_signature(vector_store.metadata_path)
+    else:
+        # DuckDB初期化
+        conn = dr.initialize_db(home_directory="/tmp")
+
+        # Parquetファイル読み込み
+        signature = get_parquet_signature(parquet_path)
+        dr.load_vectors_from_parquet(conn, parquet_path)
+
+    return Collection(
+        name=name,
+        conn=conn,
+        vector_store=vector_store,
+        parquet_path=parquet_path,
+        parquet_signature=signature,
+    )
+
+
+def close_collection(collection: Collection) -> None:
+    """コレクションの接続とメモリマップを閉じる"""
+    if collection.vector_store is not None:
+        collection.vector_store.close()
+    conn = collection.conn
+    if conn:
+        try:
+            conn.close()
+            logging.info(f"Database connection closed ({collection.name})")
+        except Exception as e:
+            logging.error(f"Error closing database connection: {e}")
 
 
 # アプリケーションのライフサイクル管理
@@ -29,34 +397,97 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
     dr.configure_logging()
     logging.info("Server initialization starting")
 
+    collections: dict[str, Collection] = {}
     try:
-        # モデル初期化
+        # モデル初期化（トークナイズ時間を計測できるようラップする）
         model, tokenizer = dr.load_model()
+        tokenizer = dr.TimedTokenizer(tokenizer)
 
-        # DuckDB初期化
-        conn = dr.initialize_db(home_directory="/tmp")
-
-        # Parquetファイル読み込み
-        parquet_path = os.environ.get("VECTOR_PARQUET", "vectors.parquet")
-        dr.load_vectors_from_parquet(conn, parquet_path)
+        # コレクションごとに接続を作成する（モデルは全コレクションで共有する）
+        collection_paths = parse_collections(
+            os.environ.get("VECTOR_COLLECTIONS"),
+            os.environ.get("VECTOR_PARQUET", "vectors.parquet"),
+        )
+        use_mmap = os.environ.get("VECTOR_BACKEND") == "mmap"
+        for name, parquet_path in collection_paths.items():
+            collections[name] = open_collection(name, parquet_path, use_mmap)
 
         logging.info("Server initialization completed successfully")
     except Exception as e:
         logging.error(f"Server initialization failed: {e}")
+        for opened in collections.values():
+            close_collection(opened)
         raise
 
+    app_ctx = AppContext(model=model, tokenizer=tokenizer, collections=collections)
+
+    # オンライン更新をParquetへ書き出すwrite-behindキュー
+    write_delay = get_env_float("VECTOR_WRITE_BEHIND_DELAY", 1.0)
+    writers = []
+    for collection in collections.values():
+        collection.write_queue = dr.WriteBehindQueue(
+            functools.partial(flush_vector_db, collection), delay=write_delay
+        )
+        writers.append(asyncio.create_task(collection.write_queue.run()))
+
+    # ドキュメント埋め込みのキャッシュ（パスを指定した場合のみ有効）
+    embedding_cache_path = os.environ.get("EMBEDDING_CACHE")
+    if embedding_cache_path:
+        app_ctx.embedding_cache = dr.EmbeddingCache(
+            embedding_cache_path,
+            dr.DEFAULT_MODEL_NAME,
+            max_entries=int(
+                get_env_float("EMBEDDING_CACHE_SIZE", dr.DEFAULT_CACHE_ENTRIES)
+            ),
+        )
+
+    # Parquetファイルの変更監視（0以下で無効）
+    watch_interval = get_env_float("VECTOR_PARQUET_WATCH_INTERVAL", 0.0)
+    watchers = []
+    if watch_interval > 0:
+        for collection in collections.values():
+            logging.info(
+                f"Watching '{collection.parquet_path}' every {watch_interval} seconds"
+            )
+            watchers.append(
+                asyncio.create_task(watch_parquet_file(collection, watch_interval))
+            )
+
+    # メトリクスの公開（ファイル出力とHTTPのいずれも任意）
+    metrics_file = os.environ.get("METRICS_FILE")
+    metrics_dumper = None
+    if metrics_file:
+        metrics_interval = get_env_float("METRICS_INTERVAL", 10.0)
+        metrics_dumper = asyncio.create_task(
+            dump_metrics_file(app_ctx, metrics_file, metrics_interval)
+        )
+    metrics_port = int(get_env_float("METRICS_PORT", 0))
+    metrics_server = None
+    if metrics_port > 0:
+        metrics_server = dr.start_metrics_server(app_ctx.metrics, metrics_port)
+
     try:
         # AppContextインスタンスを返す
-        yield AppContext(model=model, tokenizer=tokenizer, conn=conn)
+        yield app_ctx
     finally:
         # クリーンアップ処理
         logging.info("Server shutdown initiated")
-        if conn:
+        for task in watchers + writers:
+            task.cancel()
+        if metrics_dumper:
+            metrics_dumper.cancel()
+        if metrics_server:
+            metrics_server.shutdown()
+        for collection in collections.values():
             try:
-                conn.close()
-                logging.info("Database connection closed")
+                # 保留中の変更を書き出してから終了する
+                if collection.write_queue:
+                    await collection.write_queue.flush()
             except Exception as e:
-                logging.error(f"Error closing database connection: {e}")
+                logging.error(f"Error flushing pending changes: {e}")
+            close_collection(collection)
+        if app_ctx.embedding_cache is not None:
+            app_ctx.embedding_cache.close()
         logging.info("Server shutdown completed")
 
 
@@ -68,35 +499,338 @@ mcp = FastMCP(
 )
 
 
+def get_collection_documents(
+    collection: Collection, ids: list[int]
+) -> list[tuple[int, str]]:
+    """コレクションからIDを指定して (id, 内容) を取得する"""
+    if collection.vector_store is not None:
+        return collection.vector_store.get_documents(ids)
+    return dr.get_documents(collection.conn, ids)
+
+
+def search_collections(
+    targets: list[Collection],
+    vector: list[float],
+    limit: int,
+    with_content: bool = True,
+) -> list[tuple[str, float, str, int]]:
+    """各コレクションの上位 limit 件を距離順にまとめ、全体の上位 limit 件を返す
+
+    順位付けはIDとベクトルだけで行い、まとめた後に残った結果についてだけ
+    コレクションごとに内容を取得する。
+
+    Args:
+        targets: 検索するコレクション
+        vector: クエリベクトル
+        limit: 返す件数
+        with_content: 内容を取得するかどうか（False なら順位付けだけを行う）
+
+    Returns:
+        list[tuple[str, float, str, int]]: 内容・距離・コレクション名・ID
+    """
+    ranked: list[tuple[float, Collection, int]] = []
+    for target in targets:
+        if target.vector_store is not None:
+            target_rows = target.vector_store.search_ids(vector, limit)
+        else:
+            target_rows = dr.search_document_ids(target.conn, vector, limit)
+        ranked.extend(
+            (float(distance), target, doc_id) for doc_id, distance in target_rows
+        )
+    if len(targets) > 1:
+        ranked.sort(key=lambda row: row[0])
+    ranked = ranked[:limit]
+
+    contents: dict[tuple[str, int], str] = {}
+    if with_content:
+        for target in targets:
+            ids = [doc_id for _, owner, doc_id in ranked if owner is target]
+            if ids:
+                contents.update(
+                    ((target.name, doc_id), content)
+                    for doc_id, content in get_collection_documents(target, ids)
+                )
+    return [
+        (contents.get((owner.name, doc_id), ""), distance, owner.name, doc_id)
+        for distance, owner, doc_id in ranked
+    ]
+
+
+def build_contents(
+    contents: list[str], query: str, response_mode: str, max_chars: int | None
+) -> list[str]:
+    """レスポンスの形式と文字数の上限に合わせて検索結果の内容を整形する
+
+    Args:
+        contents: 順位順の検索結果の内容
+        query: 検索クエリ（スニペットの抽出に使う）
+        response_mode: full（全文）, snippet（最も一致する部分）, ids（内容なし）
+        max_chars: 全結果の合計文字数の上限（None なら無制限）
+
+    Returns:
+        list[str]: 整形した内容
+    """
+    if response_mode == "ids":
+        return ["" for _ in contents]
+    if response_mode == "snippet":
+        snippet_chars = dr.DEFAULT_SNIPPET_CHARS
+        if max_chars is not None and contents:
+            # 上限を結果の件数で等分し、全件のスニペットを返せるようにする
+            snippet_chars = max(1, min(snippet_chars, max_chars // len(contents)))
+        contents = [dr.best_passage(c, query, snippet_chars) for c in contents]
+    if max_chars is not None:
+        contents = dr.truncate_to_budget(contents, max_chars)
+    return contents
+
+
 # 検索API
 @mcp.tool()
-async def search_documents(ctx: Context, query: str, limit: int = 5) -> list[Document]:
+async def search_documents(
+    ctx: Context,
+    query: str,
+    limit: int = 5,
+    collapse_duplicates: bool = True,
+    collection: str | None = None,
+    response_mode: ResponseMode = "full",
+    max_chars: int | None = None,
+) -> list[Document]:
     """
     Search for documents that match the query.
+    Near-identical documents are collapsed into the closest one unless
+    collapse_duplicates is false.
+    collection selects a collection by name; pass several comma-separated
+    names or "*" to search them together and merge the top results.
+    response_mode "snippet" returns only the passage that best matches the
+    query and "ids" returns no content; use get_documents to fetch full
+    content. max_chars caps the total content length of the response.
     """
     logging.info(f"Searching documents with query: '{query}', limit: {limit}")
 
+    # コンテキスト経由でリソースへアクセス
+    app_ctx = ctx.request_context.lifespan_context
+
     try:
-        # コンテキスト経由でリソースへアクセス
-        app_ctx = ctx.request_context.lifespan_context
         model = app_ctx.model
         tokenizer = app_ctx.tokenizer
-        conn = app_ctx.conn
-
-        # クエリエンベディング生成と検索
-        query_embedding = dr.encode_query(model, tokenizer, query)
-        query_vector = query_embedding.cpu().squeeze().numpy().tolist()
-        result_rows = dr.search_documents(conn, cast(list[float], query_vector), limit)
+        if response_mode not in ("full", "snippet", "ids"):
+            raise ValueError(f"Unknown response_mode: {response_mode}")
+        targets = resolve_collections(app_ctx, collection)
+        timer = dr.StageTimer()
+
+        # クエリエンベディング生成（トークナイズとモデル推論を分けて計測）
+        dr.take_tokenize_seconds()
+        with timer.stage("forward"):
+            query_embedding = dr.encode_query(model, tokenizer, query)
+        tokenize_seconds = dr.take_tokenize_seconds()
+        timer.add("tokenize", tokenize_seconds)
+        timer.add("forward", -tokenize_seconds)
+
+        with timer.stage("to_list"):
+            query_vector = query_embedding.cpu().squeeze().numpy().tolist()
+
+        # 検索（重複をまとめて件数が足りなくなった場合は取得件数を増やして再検索）
+        fetch_limit = limit
+        while True:
+            with timer.stage("query"):
+                result_rows = search_collections(
+                    targets,
+                    cast(list[float], query_vector),
+                    fetch_limit,
+                    # ID のみを返す場合は重複をまとめるときだけ内容を取得する
+                    with_content=response_mode != "ids" or collapse_duplicates,
+                )
+            if not collapse_duplicates:
+                break
+            with timer.stage("collapse"):
+                collapsed_rows = dr.collapse_duplicates(
+                    result_rows, lambda row: row[0], lambda row: float(row[1])
+                )
+            if (
+                len(collapsed_rows) >= limit
+                or len(result_rows) < fetch_limit
+                or fetch_limit >= limit * MAX_FETCH_MULTIPLIER
+            ):
+                result_rows = collapsed_rows[:limit]
+                break
+            fetch_limit *= 2
 
         # 結果変換
-        documents = []
-        for row in result_rows:
-            documents.append(Document(content=row[0], distance=float(row[1])))
-
+        with timer.stage("response"):
+            contents = build_contents(
+                [row[0] for row in result_rows], query, response_mode, max_chars
+            )
+            documents = []
+            for row, content in zip(result_rows, contents):
+                document = Document(
+                    content=content,
+                    distance=float(row[1]),
+                    id=row[3],
+                    # ids では内容を取得していないため、常に全文ではない
+                    truncated=response_mode == "ids" or len(content) < len(row[0]),
+                )
+                if collection is not None:
+                    document.collection = row[2]
+                documents.append(document)
+
+        app_ctx.metrics.record(timer.finish())
         logging.info(f"Found {len(documents)} matching documents")
         return documents
     except Exception as e:
         logging.error(f"Error searching documents: {e}")
+        app_ctx.metrics.record_error()
+        raise
+
+
+# ドキュメント取得API
+@mcp.tool()
+async def get_documents(
+    ctx: Context,
+    document_ids: list[int],
+    collection: str | None = None,
+    max_chars: int | None = None,
+) -> list[Document]:
+    """
+    Fetch documents by id, e.g. the full content of results returned by
+    search_documents with response_mode "snippet" or "ids".
+    """
+    logging.info(f"Fetching documents: {document_ids}")
+
+    try:
+        app_ctx = ctx.request_context.lifespan_context
+        target = get_collection(app_ctx, collection)
+        rows = get_collection_documents(target, document_ids)
+
+        contents = [content for _, content in rows]
+        if max_chars is not None:
+            contents = dr.truncate_to_budget(contents, max_chars)
+        return [
+            Document(
+                content=content,
+                collection=collection,
+                id=doc_id,
+                truncated=len(content) < len(full_content),
+            )
+            for (doc_id, full_content), content in zip(rows, contents)
+        ]
+    except Exception as e:
+        logging.error(f"Error fetching documents: {e}")
+        raise
+
+
+# ドキュメント追加API
+@mcp.tool()
+async def add_documents(
+    ctx: Context, contents: list[str], collection: str | None = None
+) -> list[int]:
+    """
+    Add documents to the index and return their ids.
+    """
+    logging.info(f"Adding {len(contents)} documents")
+
+    try:
+        app_ctx = ctx.request_context.lifespan_context
+        target = get_collection(app_ctx, collection)
+        require_writable(target)
+        # モデル推論は検索を止めないようワーカースレッドで行う
+        vectors = await asyncio.to_thread(
+            dr.embed_documents,
+            app_ctx.model,
+            app_ctx.tokenizer,
+            contents,
+            cache=app_ctx.embedding_cache,
+        )
+        ids = dr.insert_documents(target.conn, contents, vectors)
+
+        if target.write_queue:
+            target.write_queue.mark_dirty(len(ids))
+
+        logging.info(f"Added documents: {ids}")
+        return ids
+    except Exception as e:
+        logging.error(f"Error adding documents: {e}")
+        raise
+
+
+# ドキュメント更新API
+@mcp.tool()
+async def update_document(
+    ctx: Context, document_id: int, content: str, collection: str | None = None
+) -> bool:
+    """
+    Replace the content of an existing document.
+    """
+    logging.info(f"Updating document {document_id}")
+
+    try:
+        app_ctx = ctx.request_context.lifespan_context
+        target = get_collection(app_ctx, collection)
+        require_writable(target)
+        vectors = await asyncio.to_thread(
+            dr.embed_documents,
+            app_ctx.model,
+            app_ctx.tokenizer,
+            [content],
+            cache=app_ctx.embedding_cache,
+        )
+        vector = vectors[0]
+        updated = dr.update_document(target.conn, document_id, content, vector)
+
+        if updated and target.write_queue:
+            target.write_queue.mark_dirty()
+
+        return updated
+    except Exception as e:
+        logging.error(f"Error updating document: {e}")
+        raise
+
+
+# ドキュメント削除API
+@mcp.tool()
+async def delete_documents(
+    ctx: Context, document_ids: list[int], collection: str | None = None
+) -> int:
+    """
+    Delete documents by id and return the number of deleted documents.
+    """
+    logging.info(f"Deleting documents: {document_ids}")
+
+    try:
+        app_ctx = ctx.request_context.lifespan_context
+        target = get_collection(app_ctx, collection)
+        require_writable(target)
+        deleted = dr.delete_documents(target.conn, document_ids)
+
+        if deleted and target.write_queue:
+            target.write_queue.mark_dirty(deleted)
+
+        return deleted
+    except Exception as e:
+        logging.error(f"Error deleting documents: {e}")
+        raise
+
+
+# ベクトルデータ再読み込みAPI
+@mcp.tool()
+async def reload_vectors(
+    ctx: Context, force: bool = False, collection: str | None = None
+) -> dict:
+    """
+    Reload the vector Parquet file without restarting the server.
+    """
+    logging.info(f"Reloading vectors (force={force})")
+
+    try:
+        app_ctx = ctx.request_context.lifespan_context
+        target = get_collection(app_ctx, collection)
+        reloaded = await reload_vector_db(target, force=force)
+
+        return {
+            "reloaded": reloaded,
+            "vector_file": target.parquet_path,
+            "document_count": get_document_count(target),
+        }
+    except Exception as e:
+        logging.error(f"Error reloading vectors: {e}")
         raise
 
 
@@ -111,34 +845,52 @@ async def get_system_status(ctx: Context) -> dict:
     try:
         # コンテキスト経由でリソースへアクセス
         app_ctx = ctx.request_context.lifespan_context
-        conn = app_ctx.conn
 
         status: dict[str, object] = {
-            "model_name": "pfnet/plamo-embedding-1b",
+            "model_name": dr.DEFAULT_MODEL_NAME,
             "model_status": "initialized",
             "vector_db_status": "connected",
+            "vector_backend": "duckdb"
+            if app_ctx.default_collection.vector_store is None
+            else "mmap",
         }
 
         # デバイス情報
         device_info = dr.get_device_info()
         status.update(device_info)
 
-        # Parquetファイル情報
-        parquet_path = os.environ.get("VECTOR_PARQUET", "vectors.parquet")
-        file_info = dr.get_file_info(parquet_path)
-
-        if file_info["exists"]:
-            status["vector_file"] = f"{parquet_path} ({file_info['size_mb']})"
-        else:
-            status["vector_file"] = f"{parquet_path} (not found)"
+        # 既定のコレクションのParquetファイル（mmapならサイドカー）の情報
+        status["vector_file"] = describe_vector_file(app_ctx.default_collection)
 
         # ドキュメント数
-        doc_count = dr.get_document_count(conn)
+        doc_count = get_document_count(app_ctx.default_collection)
         if doc_count >= 0:
             status["document_count"] = doc_count
         else:
             status["document_count"] = "Error: Could not retrieve count"
 
+        # 検索レイテンシとQPS
+        status["search_metrics"] = app_ctx.metrics.snapshot()
+
+        # 未書き出しの変更数
+        write_queue = app_ctx.default_collection.write_queue
+        if write_queue:
+            status["pending_writes"] = write_queue.pending
+
+        # 複数のコレクションがある場合はコレクションごとの情報
+        if len(app_ctx.collections) > 1:
+            status["collections"] = {
+                name: {
+                    "vector_file": describe_vector_file(collection),
+                    "document_count": get_document_count(collection),
+                }
+                for name, collection in app_ctx.collections.items()
+            }
+
+        # 埋め込みキャッシュのヒット率
+        if app_ctx.embedding_cache is not None:
+            status["embedding_cache"] = app_ctx.embedding_cache.stats()
+
         return status
     except Exception as e:
         logging.error(f"Error getting system status: {e}")
@@ -1,15 +1,61 @@
 import pytest
 from unittest.mock import patch, MagicMock
 
+import duckdb_rag as dr
+
 
 # モックコンテキスト
 class MockContext:
-    def __init__(self, model=None, tokenizer=None, conn=None):
+    def __init__(self, model=None, tokenizer=None, conn=None, vector_store=None):
+        from server import DEFAULT_COLLECTION, AppContext, Collection
+
         self.request_context = MagicMock()
-        self.request_context.lifespan_context = MagicMock()
-        self.request_context.lifespan_context.model = model
-        self.request_context.lifespan_context.tokenizer = tokenizer
-        self.request_context.lifespan_context.conn = conn
+        self.request_context.lifespan_context = AppContext(
+            model=model,
+            tokenizer=tokenizer,
+            collections={
+                DEFAULT_COLLECTION: Collection(
+                    name=DEFAULT_COLLECTION, conn=conn, vector_store=vector_store
+                )
+            },
+        )
+
+
+# テスト用の2048次元ベクトル（seed が近いほどコサイン距離が小さい）
+def make_vector(seed: float) -> list[float]:
+    return [seed] * 2047 + [1.0]
+
+
+# lifespan_context として app_ctx を返すリクエストコンテキスト
+def make_request(app_ctx):
+    ctx = MagicMock()
+    ctx.request_context.lifespan_context = app_ctx
+    return ctx
+
+
+# 2段階の検索（順位付けと内容の取得）に応答するDuckDB接続のモック
+def make_search_conn(ranked_rows, contents):
+    """
+    ranked_rows: 順位付けのクエリが返す (id, 距離) のリスト
+        （リストのリストを渡すと呼び出しごとに順に返す）
+    contents: 内容の取得で返す id と内容の辞書
+    """
+    ranked_result = MagicMock()
+    if ranked_rows and isinstance(ranked_rows[0], list):
+        ranked_result.fetchall.side_effect = ranked_rows
+    else:
+        ranked_result.fetchall.return_value = ranked_rows
+
+    def sql(query, params=None):
+        if "SELECT id, content" in query:
+            result = MagicMock()
+            result.fetchall.return_value = list(contents.items())
+            return result
+        return ranked_result
+
+    conn = MagicMock()
+    conn.sql.side_effect = sql
+    return conn
 
 
 # FastMCP のモックを用意
@@ -43,3 +89,14 @@ def mock_fastmcp_decorator():
         mock_mcp.tool = mock_tool
 
         yield mock_mcp
+
+
+# vss拡張を使わないテスト用のDuckDB接続
+@pytest.fixture
+def db_conn():
+    """
+    vss拡張をロードせずに初期化したインメモリDuckDB接続を用意する
+    """
+    conn = dr.initialize_db(extensions=())
+    yield conn
+    conn.close()
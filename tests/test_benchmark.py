@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+import duckdb_rag as dr
+from duckdb_rag import benchmark
+
+
+@pytest.mark.parametrize("distribution", benchmark.DISTRIBUTIONS)
+def test_generate_corpus_is_reproducible(tmp_path, db_conn, distribution):
+    first = str(tmp_path / "first.parquet")
+    second = str(tmp_path / "second.parquet")
+
+    benchmark.generate_corpus(first, 20, distribution, seed=1)
+    benchmark.generate_corpus(second, 20, distribution, seed=1)
+
+    differences = db_conn.sql(
+        f"""
+        SELECT count(*) FROM read_parquet('{first}') a
+        JOIN read_parquet('{second}') b USING (id)
+        WHERE a.vector != b.vector
+        """
+    ).fetchone()
+    assert differences == (0,)
+
+    assert dr.load_vectors_from_parquet(db_conn, first) == 20
+    metadata = dr.read_parquet_metadata(db_conn, first)
+    assert metadata["vector_dimension"] == str(dr.VECTOR_DIMENSION)
+
+
+def test_generate_queries():
+    queries = benchmark.generate_queries(3, "clustered", seed=1)
+
+    assert len(queries) == 3
+    assert all(len(q) == dr.VECTOR_DIMENSION for q in queries)
+    assert queries == benchmark.generate_queries(3, "clustered", seed=1)
+
+
+def test_run_benchmark_saves_results(tmp_path):
+    results = benchmark.run_benchmark(
+        work_dir=str(tmp_path / "data"),
+        sizes=[30],
+        distributions=["random"],
+        limits=[1, 5],
+        concurrency_levels=[1, 2],
+        query_count=4,
+        seed=1,
+    )
+
+    output = tmp_path / "results.json"
+    benchmark.save_results(results, str(output))
+    saved = json.loads(output.read_text())
+
+    assert saved["config"]["sizes"] == [30]
+    [result] = saved["results"]
+    assert result["corpus_size"] == 30
+    assert [r["limit"] for r in result["latency"]] == [1, 5]
+    assert [(r["limit"], r["concurrency"]) for r in result["throughput"]] == [
+        (1, 1),
+        (1, 2),
+        (5, 1),
+        (5, 2),
+    ]
+    assert all(r["qps"] > 0 for r in result["throughput"])
+    assert [r["limit"] for r in result["rank_latency"]] == [1, 5]
+    assert [r["limit"] for r in result["single_query_latency"]] == [1, 5]
+
+
+def test_large_documents_search_matches_single_query(tmp_path, db_conn):
+    parquet_path = str(tmp_path / "large.parquet")
+    benchmark.generate_corpus(parquet_path, 30, "random", seed=1, content_chars=5000)
+    dr.load_vectors_from_parquet(db_conn, parquet_path)
+
+    lengths = db_conn.sql("SELECT DISTINCT length(content) FROM article").fetchall()
+    assert lengths == [(5000,)]
+
+    # 順位付けと内容の取得を分けても、1つのクエリと同じ結果になる
+    query = benchmark.generate_queries(1, "random", seed=1)[0]
+    assert dr.search_documents(db_conn, query, 5) == benchmark.single_query_search(
+        db_conn, query, 5
+    )
@@ -0,0 +1,126 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import torch
+
+import duckdb_rag as dr
+from server import (
+    AppContext,
+    Collection,
+    add_documents,
+    app_lifespan,
+    parse_collections,
+    search_documents,
+)
+from tests.conftest import make_request, make_vector
+
+
+def test_parse_collections():
+    assert parse_collections(None, "vectors.parquet") == {"default": "vectors.parquet"}
+    assert parse_collections("docs=/a/docs.parquet, /b/notes.parquet", "x") == {
+        "docs": "/a/docs.parquet",
+        "notes": "/b/notes.parquet",
+    }
+    with pytest.raises(ValueError):
+        parse_collections("a=1.parquet,a=2.parquet", "x")
+
+
+@pytest.fixture
+def app_ctx():
+    # クエリは make_vector(0.2) に最も近い
+    mock_model = MagicMock()
+    mock_model.encode_query.return_value = torch.tensor([make_vector(0.2)])
+    mock_model.encode_document.side_effect = lambda docs, tokenizer: torch.tensor(
+        [make_vector(0.2)] * len(docs)
+    )
+
+    collections = {}
+    for name, docs in (
+        ("docs", {"doc-far": 0.9, "doc-near": 0.21}),
+        ("notes", {"note-nearest": 0.2, "note-far": 0.8}),
+    ):
+        conn = dr.initialize_db(extensions=())
+        dr.insert_documents(conn, list(docs), [make_vector(v) for v in docs.values()])
+        collections[name] = Collection(name=name, conn=conn)
+    yield AppContext(model=mock_model, tokenizer=MagicMock(), collections=collections)
+    for collection in collections.values():
+        collection.conn.close()
+
+
+@pytest.mark.asyncio
+async def test_search_single_and_all_collections(app_ctx):
+    ctx = make_request(app_ctx)
+
+    # 既定では最初のコレクションだけを検索する
+    documents = await search_documents(ctx, "query", limit=1)
+    assert [d.content for d in documents] == ["doc-near"]
+    assert documents[0].collection is None
+
+    documents = await search_documents(ctx, "query", limit=1, collection="notes")
+    assert [(d.content, d.collection) for d in documents] == [("note-nearest", "notes")]
+
+    # 全コレクションの結果を距離順にまとめる
+    documents = await search_documents(ctx, "query", limit=3, collection="*")
+    assert [(d.content, d.collection) for d in documents] == [
+        ("note-nearest", "notes"),
+        ("doc-near", "docs"),
+        ("note-far", "notes"),
+    ]
+
+    with pytest.raises(ValueError):
+        await search_documents(ctx, "query", collection="unknown")
+
+
+@pytest.mark.asyncio
+async def test_search_fetches_content_only_for_final_results(app_ctx):
+    ctx = make_request(app_ctx)
+
+    with patch("duckdb_rag.get_documents", wraps=dr.get_documents) as get_documents:
+        documents = await search_documents(ctx, "query", limit=1, collection="*")
+
+    # 全コレクションを順位付けしてから、残った1件のコレクションだけ内容を取得する
+    assert [(d.content, d.collection) for d in documents] == [("note-nearest", "notes")]
+    get_documents.assert_called_once()
+    conn, ids = get_documents.call_args[0]
+    assert conn is app_ctx.collections["notes"].conn
+    assert ids == [documents[0].id]
+
+
+@pytest.mark.asyncio
+async def test_add_documents_to_collection(app_ctx):
+    notes = app_ctx.collections["notes"]
+    ids = await add_documents(make_request(app_ctx), ["new note"], collection="notes")
+
+    assert len(ids) == 1
+    assert dr.get_document_count(notes.conn) == 3
+    assert dr.get_document_count(app_ctx.conn) == 2
+
+
+@pytest.mark.asyncio
+async def test_lifespan_opens_each_collection(tmp_path, monkeypatch):
+    paths = {}
+    for name in ("docs", "notes"):
+        paths[name] = str(tmp_path / f"{name}.parquet")
+        with dr.ParquetVectorWriter(paths[name]) as writer:
+            writer.write_batch([f"{name}1", f"{name}2"], [make_vector(0.1)] * 2)
+
+    monkeypatch.setenv(
+        "VECTOR_COLLECTIONS", ",".join(f"{k}={v}" for k, v in paths.items())
+    )
+    initialize_db = dr.initialize_db
+    mock_load_model = MagicMock(return_value=(MagicMock(), MagicMock()))
+    with (
+        patch("duckdb_rag.load_model", mock_load_model),
+        patch(
+            "duckdb_rag.initialize_db",
+            lambda **kwargs: initialize_db(extensions=()),
+        ),
+    ):
+        async with app_lifespan(MagicMock()) as context:
+            # モデルは1回だけ読み込み、全コレクションで共有する
+            mock_load_model.assert_called_once()
+            assert list(context.collections) == ["docs", "notes"]
+            assert context.default_collection.name == "docs"
+            notes = context.collections["notes"]
+            assert dr.get_document_count(notes.conn) == 2
+            assert notes.parquet_path == paths["notes"]
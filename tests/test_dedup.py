@@ -0,0 +1,102 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+import duckdb_rag as dr
+from duckdb_rag import dedup
+from server import search_documents
+from tests.conftest import MockContext, make_search_conn
+
+TEMPLATE = "\n".join(
+    f"## 手順{i}\nこの手順では設定ファイル{i}を編集してサービスを再起動します。"
+    for i in range(40)
+)
+
+
+def test_content_hash_ignores_whitespace():
+    assert dr.content_hash("a  b\n c") == dr.content_hash("a b c ")
+    assert dr.content_hash("a b c") != dr.content_hash("a b d")
+
+
+def test_near_duplicates_have_high_similarity():
+    hasher = dedup.MinHasher()
+    original = hasher.signature(TEMPLATE + "\n担当: 山田")
+    copy = hasher.signature(TEMPLATE + "\n担当: 佐藤")
+    other = hasher.signature("まったく関係のない議事録です。" * 20)
+
+    assert dedup.estimate_jaccard(original, copy) >= 0.9
+    assert dedup.estimate_jaccard(original, other) < 0.1
+
+
+def test_deduplicator_detects_exact_and_near_duplicates():
+    deduplicator = dr.DocumentDeduplicator(near_duplicate_threshold=0.9)
+
+    assert deduplicator.check(TEMPLATE + "\n担当: 山田") is None
+    assert deduplicator.check(TEMPLATE + "\n担当: 山田\n") == "exact"
+    assert deduplicator.check(TEMPLATE + "\n担当: 佐藤") == "near"
+    assert deduplicator.check("まったく関係のない議事録です。") is None
+    assert deduplicator.exact_duplicates == 1
+    assert deduplicator.near_duplicates == 1
+
+
+def test_exact_only_deduplicator_keeps_near_duplicates():
+    deduplicator = dr.DocumentDeduplicator()
+
+    assert deduplicator.check(TEMPLATE + "\n担当: 山田") is None
+    assert deduplicator.check(TEMPLATE + "\n担当: 佐藤") is None
+
+
+def test_collapse_duplicates_keeps_closest():
+    rows = [
+        (TEMPLATE + "\n担当: 山田", 0.10),
+        (TEMPLATE + "\n担当: 佐藤", 0.101),
+        ("別のドキュメント", 0.2),
+        (TEMPLATE + "\n担当: 山田", 0.3),
+    ]
+
+    collapsed = dr.collapse_duplicates(rows, lambda r: r[0], lambda r: r[1])
+
+    assert collapsed == [rows[0], rows[2]]
+
+
+def test_collapse_skips_distant_pairs():
+    rows = [(TEMPLATE + "\n担当: 山田", 0.1), (TEMPLATE + "\n担当: 佐藤", 0.5)]
+
+    assert dr.collapse_duplicates(rows, lambda r: r[0], lambda r: r[1]) == rows
+
+
+@pytest.fixture
+def mock_ctx():
+    mock_model = MagicMock()
+    mock_model.encode_query.return_value = torch.tensor([[0.1] * 2048])
+
+    mock_conn = make_search_conn(
+        [
+            [(1, 0.1), (2, 0.1)],
+            [(1, 0.1), (2, 0.1), (3, 0.2), (4, 0.3)],
+        ],
+        {1: "doc1", 2: "doc1", 3: "doc2", 4: "doc3"},
+    )
+    yield MockContext(model=mock_model, tokenizer=MagicMock(), conn=mock_conn)
+
+
+@pytest.mark.asyncio
+async def test_search_refetches_after_collapsing(mock_ctx):
+    results = await search_documents(ctx=mock_ctx, query="テスト", limit=2)
+
+    assert [d.content for d in results] == ["doc1", "doc2"]
+    conn = mock_ctx.request_context.lifespan_context.conn
+    limits = [
+        call[1]["params"][0] for call in conn.sql.call_args_list if "params" in call[1]
+    ]
+    assert limits == [2, 4]
+
+
+@pytest.mark.asyncio
+async def test_search_without_collapsing(mock_ctx):
+    results = await search_documents(
+        ctx=mock_ctx, query="テスト", limit=2, collapse_duplicates=False
+    )
+
+    assert [d.content for d in results] == ["doc1", "doc1"]
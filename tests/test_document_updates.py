@@ -0,0 +1,175 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+import duckdb_rag as dr
+from server import (
+    DEFAULT_COLLECTION,
+    AppContext,
+    Collection,
+    add_documents,
+    delete_documents,
+    flush_vector_db,
+    has_pending_writes,
+    update_document,
+)
+from tests.conftest import make_request, make_vector
+
+
+@pytest.fixture
+def app_ctx(db_conn, tmp_path):
+    # バッチの大きさに合わせた埋め込みを返すモデル
+    mock_model = MagicMock()
+    mock_model.encode_document.side_effect = lambda docs, tokenizer: torch.tensor(
+        [make_vector(0.1)] * len(docs)
+    )
+
+    collection = Collection(
+        name=DEFAULT_COLLECTION,
+        conn=db_conn,
+        parquet_path=str(tmp_path / "vectors.parquet"),
+    )
+    collection.write_queue = dr.WriteBehindQueue(
+        lambda: flush_vector_db(collection), delay=0
+    )
+    yield AppContext(
+        model=mock_model,
+        tokenizer=MagicMock(),
+        collections={DEFAULT_COLLECTION: collection},
+    )
+
+
+def test_ids_continue_after_parquet_load(db_conn, tmp_path):
+    parquet_path = str(tmp_path / "vectors.parquet")
+    with dr.ParquetVectorWriter(parquet_path) as writer:
+        writer.write_batch(["doc1", "doc2"], [make_vector(0.1), make_vector(0.2)])
+
+    dr.load_vectors_from_parquet(db_conn, parquet_path)
+    ids = dr.insert_documents(db_conn, ["doc3"], [make_vector(0.3)])
+
+    assert ids[0] > 2
+
+
+def test_update_and_delete_documents(db_conn):
+    ids = dr.insert_documents(
+        db_conn, ["doc1", "doc2"], [make_vector(0.1), make_vector(0.2)]
+    )
+
+    assert dr.update_document(db_conn, ids[0], "updated", make_vector(0.5))
+    assert not dr.update_document(db_conn, 999, "missing", make_vector(0.5))
+    assert dr.delete_documents(db_conn, [ids[1], 999]) == 1
+
+    rows = db_conn.sql("SELECT id, content FROM article").fetchall()
+    assert rows == [(ids[0], "updated")]
+
+
+@pytest.mark.asyncio
+async def test_document_tools_mark_pending_writes(app_ctx):
+    ctx = make_request(app_ctx)
+
+    ids = await add_documents(ctx=ctx, contents=[f"doc{i}" for i in range(12)])
+    assert len(ids) == 12
+    # バッチサイズごとにエンコードされる
+    assert app_ctx.model.encode_document.call_count == 2
+
+    assert await update_document(ctx=ctx, document_id=ids[0], content="updated")
+    assert await delete_documents(ctx=ctx, document_ids=ids[1:3]) == 2
+    assert app_ctx.default_collection.write_queue.pending == 15
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flushes_to_parquet(app_ctx):
+    ctx = make_request(app_ctx)
+    collection = app_ctx.default_collection
+    await add_documents(ctx=ctx, contents=["doc1", "doc2"])
+
+    task = asyncio.create_task(collection.write_queue.run())
+    try:
+        for _ in range(100):
+            if collection.write_queue.flush_count:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+
+    assert collection.write_queue.pending == 0
+    assert collection.parquet_signature is not None
+
+    rows = collection.conn.sql(
+        f"SELECT content FROM read_parquet('{collection.parquet_path}') ORDER BY id"
+    ).fetchall()
+    assert rows == [("doc1",), ("doc2",)]
+
+
+@pytest.mark.asyncio
+async def test_embedding_runs_off_the_event_loop(app_ctx):
+    threads = []
+    app_ctx.model.encode_document.side_effect = lambda docs, tokenizer: (
+        threads.append(threading.get_ident()) or torch.tensor([make_vector(0.1)])
+    )
+
+    await add_documents(ctx=make_request(app_ctx), contents=["doc1"])
+
+    assert threads and threads[0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_flush_does_not_overwrite_replaced_file(app_ctx):
+    ctx = make_request(app_ctx)
+    collection = app_ctx.default_collection
+    await add_documents(ctx=ctx, contents=["doc1"])
+    await collection.write_queue.flush()
+
+    # 読み込み後に別のファイルへ差し替えられた場合は書き出さない
+    with open(collection.parquet_path, "wb") as f:
+        f.write(b"replaced externally")
+    await add_documents(ctx=ctx, contents=["doc2"])
+
+    with pytest.raises(RuntimeError):
+        await collection.write_queue.flush()
+
+    with open(collection.parquet_path, "rb") as f:
+        assert f.read() == b"replaced externally"
+    assert collection.write_queue.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_discard_during_flush_keeps_later_changes_pending(app_ctx):
+    ctx = make_request(app_ctx)
+    collection = app_ctx.default_collection
+    await add_documents(ctx=ctx, contents=["doc1", "doc2", "doc3"])
+
+    # 書き出しが再読み込みのロックを待っている間に、強制的な再読み込みが
+    # 変更を破棄し、その後に新しいドキュメントが追加される
+    async with collection.reload_lock:
+        flush = asyncio.create_task(collection.write_queue.flush())
+        await asyncio.sleep(0)
+        assert collection.write_queue.discard() == 3
+        await add_documents(ctx=ctx, contents=["doc4"])
+    await flush
+
+    assert collection.write_queue.pending == 1
+    assert has_pending_writes(collection)
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_changes():
+    flush = MagicMock()
+
+    async def do_flush():
+        flush()
+
+    queue = dr.WriteBehindQueue(do_flush, delay=0.05)
+    task = asyncio.create_task(queue.run())
+    try:
+        for _ in range(5):
+            queue.mark_dirty()
+        await asyncio.sleep(0.2)
+    finally:
+        task.cancel()
+
+    flush.assert_called_once()
+    assert queue.pending == 0
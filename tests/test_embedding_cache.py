@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+import torch
+
+import duckdb_rag as dr
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embedding_cache.sqlite")
+
+
+def test_cache_hit_and_miss(cache_path):
+    cache = dr.EmbeddingCache(cache_path, "model-a", vector_dimension=4)
+    try:
+        assert cache.get_many(["doc"]) == {}
+        cache.put_many(["doc"], [[0.1, 0.2, 0.3, 0.4]])
+
+        found = cache.get_many(["doc", "other"])
+        assert list(found.values()) == [pytest.approx([0.1, 0.2, 0.3, 0.4])]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+    finally:
+        cache.close()
+
+
+def test_cache_persists_and_separates_models(cache_path):
+    cache = dr.EmbeddingCache(cache_path, "model-a", vector_dimension=4)
+    cache.put_many(["doc"], [[1.0, 0.0, 0.0, 0.0]])
+    cache.close()
+
+    # 同じファイルでもモデルが異なればヒットしない
+    reopened = dr.EmbeddingCache(cache_path, "model-a", vector_dimension=4)
+    other_model = None
+    try:
+        assert len(reopened.get_many(["doc"])) == 1
+        reopened.close()
+        other_model = dr.EmbeddingCache(cache_path, "model-b", vector_dimension=4)
+        assert other_model.get_many(["doc"]) == {}
+    finally:
+        if other_model is not None:
+            other_model.close()
+
+
+def test_cache_evicts_least_recently_used(cache_path):
+    cache = dr.EmbeddingCache(cache_path, "model-a", max_entries=2, vector_dimension=4)
+    try:
+        cache.put_many(["a", "b"], [[1.0] * 4, [2.0] * 4])
+        # a を使ってから c を追加すると、使われていない b が削除される
+        with patch("time.time", return_value=1e12):
+            cache.get_many(["a"])
+        with patch("time.time", return_value=2e12):
+            cache.put_many(["c"], [[3.0] * 4])
+
+        assert len(cache) == 2
+        assert set(cache.get_many(["a", "b", "c"])) == {
+            dr.embedding_cache.embedding_key("a"),
+            dr.embedding_cache.embedding_key("c"),
+        }
+    finally:
+        cache.close()
+
+
+def test_embed_documents_encodes_only_misses(cache_path):
+    cache = dr.EmbeddingCache(cache_path, "model-a", vector_dimension=4)
+    cache.put_many(["cached"], [[1.0, 1.0, 1.0, 1.0]])
+
+    def fake_encode(model, tokenizer, documents):
+        return torch.tensor([[float(len(d))] * 4 for d in documents])
+
+    try:
+        with patch(
+            "duckdb_rag.model.encode_document", side_effect=fake_encode
+        ) as encode:
+            vectors = dr.embed_documents(
+                None, None, ["new", "cached", "new"], cache=cache
+            )
+
+        # 重複とキャッシュ済みのドキュメントはエンコードしない
+        encode.assert_called_once_with(None, None, ["new"])
+        assert vectors == [[3.0] * 4, [1.0] * 4, [3.0] * 4]
+        assert len(cache.get_many(["new"])) == 1
+    finally:
+        cache.close()
+
+
+def test_cache_is_shared_across_processes(cache_path):
+    cache = dr.EmbeddingCache(cache_path, "model-a", vector_dimension=4)
+    try:
+        cache.put_many(["doc"], [[1.0, 0.0, 0.0, 0.0]])
+
+        # 開いたままのキャッシュに別のプロセスから読み書きできる
+        script = (
+            "import duckdb_rag as dr\n"
+            f"cache = dr.EmbeddingCache({cache_path!r}, 'model-a', vector_dimension=4)\n"
+            "assert len(cache.get_many(['doc'])) == 1\n"
+            "cache.put_many(['other'], [[0.0, 1.0, 0.0, 0.0]])\n"
+            "cache.close()\n"
+        )
+        subprocess.run(
+            [sys.executable, "-c", script],
+            check=True,
+            timeout=120,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+
+        assert len(cache.get_many(["other"])) == 1
+    finally:
+        cache.close()
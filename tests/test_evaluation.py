@@ -0,0 +1,97 @@
+import pytest
+
+import duckdb_rag as dr
+from duckdb_rag import benchmark, evaluation
+
+
+def test_ranking_metrics():
+    relevant = {1: 1.0, 2: 1.0}
+
+    assert evaluation.recall_at_k([3, 1, 2], relevant, 1) == 0.0
+    assert evaluation.recall_at_k([3, 1, 2], relevant, 2) == 0.5
+    assert evaluation.recall_at_k([3, 1, 2], relevant, 3) == 1.0
+    # 正解が k 件より多ければ recall は 1.0 に達しない
+    assert evaluation.recall_at_k([1], {1: 1.0, 2: 1.0, 3: 1.0}, 1) == pytest.approx(
+        1 / 3
+    )
+    assert evaluation.reciprocal_rank([3, 1, 2], relevant) == 0.5
+    assert evaluation.reciprocal_rank([3, 4], relevant) == 0.0
+    assert evaluation.ndcg_at_k([1, 2, 3], relevant, 3) == pytest.approx(1.0)
+    assert evaluation.ndcg_at_k([3, 1, 2], relevant, 3) < 1.0
+
+
+def test_graded_ndcg_prefers_more_relevant_first():
+    relevant = {1: 3.0, 2: 1.0}
+
+    assert evaluation.ndcg_at_k([1, 2], relevant, 2) == pytest.approx(1.0)
+    assert evaluation.ndcg_at_k([2, 1], relevant, 2) < 1.0
+
+
+def test_exact_ground_truth_and_backend_comparison(tmp_path, db_conn):
+    parquet_path = str(tmp_path / "corpus.parquet")
+    benchmark.generate_corpus(parquet_path, 50, "clustered", seed=1)
+    dr.load_vectors_from_parquet(db_conn, parquet_path)
+
+    queries = benchmark.generate_queries(5, "clustered", seed=1)
+    relevances = evaluation.exact_ground_truth(db_conn, queries, 5)
+    exact = evaluation.duckdb_backend(db_conn)
+
+    # 全件検索の結果を逆順に返す、精度の低いバックエンド
+    def reversed_backend(vector, limit):
+        return list(reversed(exact(vector, 50)))[:limit]
+
+    results = evaluation.evaluate_backends(
+        {"exact": exact, "reversed": reversed_backend},
+        queries,
+        relevances,
+        ks=(1, 5),
+    )
+
+    assert results["exact"]["recall@5"] == 1.0
+    assert results["exact"]["mrr"] == 1.0
+    assert results["reversed"]["recall@5"] < 1.0
+    assert "p95_ms" in results["reversed"]
+
+
+def test_exact_ground_truth_scores_ranking_order(tmp_path, db_conn):
+    parquet_path = str(tmp_path / "corpus.parquet")
+    benchmark.generate_corpus(parquet_path, 50, "clustered", seed=1)
+    dr.load_vectors_from_parquet(db_conn, parquet_path)
+
+    queries = benchmark.generate_queries(5, "clustered", seed=1)
+    relevances = evaluation.exact_ground_truth(db_conn, queries, 10)
+    exact = evaluation.duckdb_backend(db_conn)
+
+    # 全件検索の上位10件を逆順に返すバックエンドは、集合としては一致するが
+    # 上位の件数では精度が下がる
+    def reversed_top_backend(vector, limit):
+        return list(reversed(exact(vector, 10)))[:limit]
+
+    results = evaluation.evaluate_backends(
+        {"exact": exact, "reversed": reversed_top_backend},
+        queries,
+        relevances,
+        ks=(1, 5, 10),
+    )
+
+    assert results["exact"]["recall@1"] == 1.0
+    assert results["exact"]["ndcg@5"] == 1.0
+    assert results["reversed"]["recall@1"] < 1.0
+    assert results["reversed"]["recall@5"] < 1.0
+    assert results["reversed"]["ndcg@1"] < 1.0
+    assert results["reversed"]["mrr"] < 1.0
+    assert results["reversed"]["recall@10"] == 1.0
+    assert results["reversed"]["ndcg@10"] < 1.0
+
+
+def test_load_labeled_queries(tmp_path):
+    path = tmp_path / "labels.jsonl"
+    path.write_text(
+        '{"query": "a", "relevant": [1, 2]}\n\n{"query": "b", "relevant": {"3": 2}}\n',
+        encoding="utf-8",
+    )
+
+    queries, relevances = evaluation.load_labeled_queries(str(path))
+
+    assert queries == ["a", "b"]
+    assert relevances == [{1: 1.0, 2: 1.0}, {3: 2.0}]
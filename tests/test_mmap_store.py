@@ -0,0 +1,139 @@
+import os
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+import duckdb_rag as dr
+from duckdb_rag import benchmark, evaluation
+from server import add_documents, search_documents
+from tests.conftest import MockContext, make_vector
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    parquet_path = str(tmp_path / "vectors.parquet")
+    benchmark.generate_corpus(parquet_path, 200, "clustered")
+    return parquet_path
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_mmap_search_matches_duckdb(corpus_path, db_conn, dtype):
+    count = dr.export_mmap_store(corpus_path, dtype=dtype, chunk_rows=64)
+    assert count == 200
+
+    store = dr.MmapVectorStore(dr.default_mmap_directory(corpus_path))
+    try:
+        assert store.vectors.dtype == dtype
+        dr.load_vectors_from_parquet(db_conn, corpus_path)
+        for query in benchmark.generate_queries(5, "clustered"):
+            expected = dr.search_document_ids(db_conn, query, 5)
+            actual = store.search_ids(query, 5)
+            assert [i for i, _ in actual] == [i for i, _ in expected]
+            assert actual[0][1] == pytest.approx(expected[0][1], abs=1e-3)
+    finally:
+        store.close()
+
+
+def test_mmap_store_contents_round_trip(tmp_path):
+    parquet_path = str(tmp_path / "vectors.parquet")
+    with dr.ParquetVectorWriter(parquet_path) as writer:
+        writer.write_batch(["東京の天気", "", "大阪"], [make_vector(0.1)] * 3)
+
+    dr.export_mmap_store(parquet_path)
+    store = dr.MmapVectorStore(str(tmp_path / "vectors.mmap"))
+    try:
+        assert [store.content(i) for i in range(len(store))] == [
+            "東京の天気",
+            "",
+            "大阪",
+        ]
+        assert store.metadata["document_count"] == 3
+        assert store.get_documents([3, 99, 1]) == [(3, "大阪"), (1, "東京の天気")]
+        # mmap バックエンドも評価に使える
+        search = evaluation.mmap_backend(store)
+        assert len(search(make_vector(0.1), 10)) == 3
+    finally:
+        store.close()
+
+
+def test_export_switches_versions_atomically(tmp_path):
+    parquet_path = str(tmp_path / "vectors.parquet")
+    directory = str(tmp_path / "vectors.mmap")
+    with dr.ParquetVectorWriter(parquet_path) as writer:
+        writer.write_batch(["old1", "old2"], [make_vector(0.1)] * 2)
+    dr.export_mmap_store(parquet_path)
+    old_store = dr.MmapVectorStore(directory)
+
+    # 同じ件数で内容が異なるファイルを書き出しても、開いている側は古い内容のまま
+    with dr.ParquetVectorWriter(parquet_path) as writer:
+        writer.write_batch(["new1", "new2"], [make_vector(0.2)] * 2)
+    dr.export_mmap_store(parquet_path)
+    dr.export_mmap_store(parquet_path)
+    new_store = dr.MmapVectorStore(directory)
+    try:
+        assert old_store.content(0) == "old1"
+        assert new_store.content(0) == "new1"
+        # 現在と直前のバージョンだけが残る
+        versions = os.listdir(os.path.join(directory, "versions"))
+        assert len(versions) == 2
+        assert new_store.metadata["version"] in versions
+    finally:
+        old_store.close()
+        new_store.close()
+
+
+def test_export_keeps_unrelated_directories(tmp_path):
+    parquet_path = str(tmp_path / "vectors.parquet")
+    with dr.ParquetVectorWriter(parquet_path) as writer:
+        writer.write_batch(["doc1"], [make_vector(0.1)])
+
+    # 出力先に既にあるディレクトリは、名前が v で始まっても削除しない
+    directory = tmp_path / "sidecar"
+    for name in ("venv", "vendor", "v1"):
+        (directory / name).mkdir(parents=True)
+    for _ in range(3):
+        dr.export_mmap_store(parquet_path, str(directory))
+
+    assert {"venv", "vendor", "v1"} <= set(os.listdir(directory))
+    assert len(os.listdir(directory / "versions")) == 2
+
+
+def test_store_rejects_mismatched_files(tmp_path):
+    parquet_path = str(tmp_path / "vectors.parquet")
+    with dr.ParquetVectorWriter(parquet_path) as writer:
+        writer.write_batch(["doc1", "doc2"], [make_vector(0.1)] * 2)
+    dr.export_mmap_store(parquet_path)
+
+    directory = str(tmp_path / "vectors.mmap")
+    store = dr.MmapVectorStore(directory)
+    version = store.metadata["version"]
+    store.close()
+
+    # 本文のファイルがオフセットと一致しなければ開かない
+    with open(os.path.join(directory, "versions", version, "contents.bin"), "ab") as f:
+        f.write(b"extra")
+    with pytest.raises(ValueError):
+        dr.MmapVectorStore(directory)
+
+
+@pytest.mark.asyncio
+async def test_search_and_mutation_with_mmap_backend(corpus_path):
+    dr.export_mmap_store(corpus_path)
+    store = dr.MmapVectorStore(dr.default_mmap_directory(corpus_path))
+    query = benchmark.generate_queries(1, "clustered")[0]
+
+    mock_model = MagicMock()
+    mock_model.encode_query.return_value = torch.tensor([query])
+    ctx = MockContext(model=mock_model, tokenizer=MagicMock(), vector_store=store)
+    try:
+        documents = await search_documents(ctx, "query", limit=3)
+        assert [d.content for d in documents] == [
+            store.content(i) for i, _ in store.search_indices(query, 3)
+        ]
+
+        # 読み取り専用のため変更は拒否される
+        with pytest.raises(RuntimeError):
+            await add_documents(ctx, ["new"])
+    finally:
+        store.close()
@@ -0,0 +1,71 @@
+import pytest
+
+import duckdb_rag as dr
+from tests.conftest import make_vector
+
+
+def test_writer_streams_batches_into_single_file(tmp_path, db_conn):
+    parquet_path = str(tmp_path / "vectors.parquet")
+
+    with dr.ParquetVectorWriter(parquet_path, row_group_size=2) as writer:
+        writer.write_batch(["doc1", "doc2"], [make_vector(0.1), make_vector(0.2)])
+        writer.write_batch(["doc3"], [make_vector(0.3)])
+
+    # 一時ファイルが残っていないことを確認
+    assert [p.name for p in tmp_path.iterdir()] == ["vectors.parquet"]
+
+    rows = db_conn.sql(
+        f"SELECT id, content FROM read_parquet('{parquet_path}') ORDER BY id"
+    ).fetchall()
+    assert rows == [(1, "doc1"), (2, "doc2"), (3, "doc3")]
+
+    # 行グループサイズが反映されていることを確認
+    row_groups = db_conn.sql(
+        f"SELECT count(DISTINCT row_group_id) FROM parquet_metadata('{parquet_path}')"
+    ).fetchone()
+    assert row_groups == (2,)
+
+
+def test_writer_metadata_and_column_order(tmp_path, db_conn):
+    parquet_path = str(tmp_path / "vectors.parquet")
+
+    with dr.ParquetVectorWriter(
+        parquet_path,
+        compression="zstd",
+        compression_level=3,
+        columns=("vector", "id", "content"),
+    ) as writer:
+        writer.write_batch(["doc1"], [make_vector(0.1)])
+
+    metadata = dr.read_parquet_metadata(db_conn, parquet_path)
+    assert metadata["vector_dimension"] == "2048"
+    assert metadata["model_name"] == dr.DEFAULT_MODEL_NAME
+    assert metadata["document_count"] == "1"
+    assert metadata["content_bytes"] == "4"
+
+    columns = db_conn.sql(f"SELECT * FROM read_parquet('{parquet_path}')").columns
+    assert columns == ["vector", "id", "content"]
+
+    # 列の並び順が異なっていても読み込めることを確認
+    assert dr.load_vectors_from_parquet(db_conn, parquet_path) == 1
+
+
+def test_load_rejects_dimension_mismatch(tmp_path, db_conn):
+    parquet_path = str(tmp_path / "vectors.parquet")
+
+    with dr.ParquetVectorWriter(parquet_path, vector_dimension=4) as writer:
+        writer.write_batch(["doc1"], [[0.1, 0.2, 0.3, 0.4]])
+
+    with pytest.raises(ValueError):
+        dr.load_vectors_from_parquet(db_conn, parquet_path)
+
+
+def test_writer_abort_removes_temporary_files(tmp_path):
+    parquet_path = str(tmp_path / "vectors.parquet")
+
+    with pytest.raises(RuntimeError):
+        with dr.ParquetVectorWriter(parquet_path) as writer:
+            writer.write_batch(["doc1"], [make_vector(0.1)])
+            raise RuntimeError("interrupted")
+
+    assert list(tmp_path.iterdir()) == []
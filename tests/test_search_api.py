@@ -3,7 +3,7 @@ from unittest.mock import MagicMock
 import torch
 
 from server import search_documents, Document
-from tests.conftest import MockContext
+from tests.conftest import MockContext, make_search_conn
 
 
 @pytest.fixture
@@ -15,15 +15,15 @@ def mock_setup():
 
     mock_tokenizer = MagicMock()
 
-    mock_result = MagicMock()
-    mock_result.fetchall.return_value = [
-        ("テストドキュメント1", 0.1),
-        ("テストドキュメント2", 0.2),
-        ("テストドキュメント3", 0.3),
-    ]
-
-    mock_conn = MagicMock()
-    mock_conn.sql.return_value = mock_result
+    # 順位付けの結果（IDと距離）と、上位のIDについて取得する内容
+    mock_conn = make_search_conn(
+        [(1, 0.1), (2, 0.2), (3, 0.3)],
+        {
+            3: "テストドキュメント3",
+            1: "テストドキュメント1",
+            2: "テストドキュメント2",
+        },
+    )
 
     # コンテキスト生成
     mock_ctx = MockContext(model=mock_model, tokenizer=mock_tokenizer, conn=mock_conn)
@@ -49,19 +49,26 @@ async def test_search_documents_api(mock_setup):
         query, mock_setup["tokenizer"]
     )
 
-    # SQLクエリが正しく実行されたか確認
-    mock_setup["conn"].sql.assert_called_once()
-    sql_query = mock_setup["conn"].sql.call_args[0][0]
-    assert "SELECT content, array_cosine_distance" in sql_query
+    # 順位付けと内容の取得の2回のクエリが実行されたか確認
+    assert mock_setup["conn"].sql.call_count == 2
+    rank_call, content_call = mock_setup["conn"].sql.call_args_list
+
+    # 順位付けのSQLクエリがIDとベクトルだけを読むことを確認
+    sql_query = rank_call[0][0]
+    assert "SELECT id, array_cosine_distance" in sql_query
+    assert "content" not in sql_query
     assert "ORDER BY distance" in sql_query
     assert "LIMIT ?" in sql_query
 
     # パラメータが正しいか確認
-    assert mock_setup["conn"].sql.call_args[1]["params"]
-    params = mock_setup["conn"].sql.call_args[1]["params"]
+    params = rank_call[1]["params"]
     assert isinstance(params, list)
-    assert len(params) == 2
-    assert params[1] == limit
+    assert params == [limit]
+
+    # 内容は上位のIDについてだけ取得することを確認
+    content_query = content_call[0][0]
+    assert "SELECT id, content" in content_query
+    assert "IN (1, 2, 3)" in content_query
 
     # 戻り値が期待通りであることを確認
     assert len(results) == 3
@@ -77,7 +84,8 @@ async def test_search_documents_api(mock_setup):
 @pytest.mark.asyncio
 async def test_search_documents_empty_result(mock_setup):
     # 空の結果をシミュレート
-    mock_setup["conn"].sql.return_value.fetchall.return_value = []
+    app_ctx = mock_setup["ctx"].request_context.lifespan_context
+    app_ctx.default_collection.conn = make_search_conn([], {})
 
     # search_documents関数を呼び出し
     results = await search_documents(ctx=mock_setup["ctx"], query="存在しないクエリ")
@@ -92,5 +100,21 @@ async def test_search_documents_default_limit(mock_setup):
     await search_documents(ctx=mock_setup["ctx"], query="テストクエリ")
 
     # SQLクエリのパラメータでlimitが5になっていることを確認
-    params = mock_setup["conn"].sql.call_args[1]["params"]
-    assert params[1] == 5
+    params = mock_setup["conn"].sql.call_args_list[0][1]["params"]
+    assert params[0] == 5
+
+
+@pytest.mark.asyncio
+async def test_search_ids_only_skips_content(mock_setup):
+    results = await search_documents(
+        ctx=mock_setup["ctx"],
+        query="テストクエリ",
+        limit=3,
+        collapse_duplicates=False,
+        response_mode="ids",
+    )
+
+    # 順位付けだけを行い、内容は取得しない
+    assert [(d.id, d.content) for d in results] == [(1, ""), (2, ""), (3, "")]
+    assert all(d.truncated for d in results)
+    mock_setup["conn"].sql.assert_called_once()
@@ -0,0 +1,97 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+import duckdb_rag as dr
+from server import get_system_status, search_documents
+from tests.conftest import MockContext, make_search_conn
+
+
+@pytest.fixture
+def mock_ctx():
+    mock_model = MagicMock()
+
+    # トークナイザーを呼び出してから埋め込みを返すモデル
+    def encode_query(query, tokenizer):
+        tokenizer(query)
+        return torch.tensor([[0.1] * 2048])
+
+    mock_model.encode_query.side_effect = encode_query
+
+    mock_conn = make_search_conn([(1, 0.1)], {1: "doc"})
+
+    ctx = MockContext(
+        model=mock_model, tokenizer=dr.TimedTokenizer(MagicMock()), conn=mock_conn
+    )
+    yield ctx
+
+
+@pytest.mark.asyncio
+async def test_search_records_stage_timings(mock_ctx):
+    for _ in range(3):
+        await search_documents(ctx=mock_ctx, query="テスト")
+
+    snapshot = mock_ctx.request_context.lifespan_context.metrics.snapshot()
+    assert snapshot["search_count"] == 3
+    assert snapshot["search_errors"] == 0
+    assert snapshot["qps"] > 0
+    for stage in dr.metrics.SEARCH_STAGES:
+        assert set(snapshot["latency_ms"][stage]) == {"p50", "p95", "p99"}
+
+
+@pytest.mark.asyncio
+async def test_search_records_errors(mock_ctx):
+    mock_ctx.request_context.lifespan_context.conn.sql.side_effect = RuntimeError
+
+    with pytest.raises(RuntimeError):
+        await search_documents(ctx=mock_ctx, query="テスト")
+
+    snapshot = mock_ctx.request_context.lifespan_context.metrics.snapshot()
+    assert snapshot["search_errors"] == 1
+    assert snapshot["search_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_system_status_includes_metrics(mock_ctx):
+    await search_documents(ctx=mock_ctx, query="テスト")
+
+    status = await get_system_status(ctx=mock_ctx)
+
+    assert status["search_metrics"]["search_count"] == 1
+
+
+def test_timed_tokenizer_measures_calls():
+    tokenizer = dr.TimedTokenizer(MagicMock(pad_token_id=0))
+    dr.take_tokenize_seconds()
+
+    tokenizer("text")
+    tokenizer.encode("text")
+
+    assert tokenizer.pad_token_id == 0
+    assert dr.take_tokenize_seconds() > 0
+    assert dr.take_tokenize_seconds() == 0
+
+
+def test_histogram_percentiles():
+    histogram = dr.metrics.LatencyHistogram(window=100)
+    for i in range(1, 101):
+        histogram.observe(i / 1000)
+
+    percentiles = histogram.percentiles()
+    assert percentiles["p50"] == pytest.approx(0.051)
+    assert percentiles["p95"] == pytest.approx(0.096)
+    assert percentiles["p99"] == pytest.approx(0.1)
+
+
+def test_prometheus_output(tmp_path):
+    metrics = dr.SearchMetrics()
+    metrics.record({"query": 0.01, "total": 0.02})
+
+    path = tmp_path / "metrics.prom"
+    dr.write_prometheus_file(metrics, str(path))
+
+    text = path.read_text()
+    assert 'rag_search_latency_seconds{stage="query",quantile="0.5"} 0.010000' in text
+    assert 'rag_search_latency_seconds_count{stage="total"} 1' in text
+    assert "rag_search_requests_total 1" in text
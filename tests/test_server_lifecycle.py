@@ -43,6 +43,7 @@ def mock_environment():
         patch("duckdb_rag.load_model", mock_load_model),
         patch("duckdb_rag.initialize_db", mock_initialize_db),
         patch("duckdb_rag.load_vectors_from_parquet", mock_load_vectors),
+        patch("duckdb_rag.EmbeddingCache", MagicMock()),
         patch("os.path.exists", mock_os.path.exists),
         patch("os.environ.get", mock_os.environ.get),
         patch.dict("sys.modules", {"torch": mock_torch}),
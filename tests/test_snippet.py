@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+import duckdb_rag as dr
+from duckdb_rag import snippet
+from server import get_documents, search_documents
+from tests.conftest import MockContext, make_vector
+
+DOCUMENT = "\n\n".join(
+    [
+        "# 議事録",
+        "本日の会議では来期の予算について議論した。" * 5,
+        "## サーバー移行\nデータベースサーバーの移行は来月に実施する。",
+        "その他の連絡事項はありません。" * 5,
+    ]
+)
+
+
+def test_split_passages_respects_max_chars():
+    passages = snippet.split_passages(DOCUMENT, max_chars=60)
+
+    assert all(len(p) <= 60 for p in passages)
+    assert "".join(passages).replace("\n", "") == DOCUMENT.replace("\n", "")
+
+
+def test_best_passage_matches_query_bigrams():
+    passage = dr.best_passage(DOCUMENT, "サーバーの移行日", max_chars=60)
+
+    assert "データベースサーバーの移行" in passage
+    assert len(passage) <= 60
+    # 一致がなければ最初のパッセージを返す
+    assert dr.best_passage(DOCUMENT, "zzz", max_chars=60) == "# 議事録"
+
+
+def test_truncate_to_budget():
+    assert dr.truncate_to_budget(["abcd", "efgh", "ijkl"], 6) == ["abcd", "ef", ""]
+
+
+@pytest.fixture
+def request_ctx(db_conn):
+    dr.insert_documents(
+        db_conn, [DOCUMENT, "短い文書"], [make_vector(0.1), make_vector(0.5)]
+    )
+    mock_model = MagicMock()
+    mock_model.encode_query.return_value = torch.tensor([make_vector(0.1)])
+
+    return MockContext(model=mock_model, tokenizer=MagicMock(), conn=db_conn)
+
+
+@pytest.mark.asyncio
+async def test_search_response_modes(request_ctx):
+    full = await search_documents(request_ctx, "サーバーの移行", limit=2)
+    assert full[0].content == DOCUMENT
+    assert full[0].truncated is False
+
+    snippets = await search_documents(
+        request_ctx, "サーバーの移行", limit=2, response_mode="snippet", max_chars=100
+    )
+    assert "データベースサーバーの移行" in snippets[0].content
+    assert sum(len(d.content) for d in snippets) <= 100
+    assert snippets[0].truncated is True
+    assert snippets[1].content == "短い文書"
+
+    ids = await search_documents(request_ctx, "サーバーの移行", response_mode="ids")
+    assert [d.id for d in ids] == [d.id for d in full]
+    assert all(d.content == "" for d in ids)
+
+    with pytest.raises(ValueError):
+        await search_documents(request_ctx, "query", response_mode="unknown")
+
+
+@pytest.mark.asyncio
+async def test_get_documents_fetches_full_content(request_ctx):
+    ids = await search_documents(request_ctx, "query", response_mode="ids")
+    documents = await get_documents(request_ctx, [ids[0].id, 999])
+
+    assert [(d.id, d.content) for d in documents] == [(ids[0].id, DOCUMENT)]
+
+    documents = await get_documents(request_ctx, [ids[0].id], max_chars=10)
+    assert documents[0].content == DOCUMENT[:10]
+    assert documents[0].truncated is True
@@ -88,3 +88,27 @@ async def test_get_system_status_no_cuda(mock_setup):
 
     # デバイスがCPUになっていることを確認
     assert status["device"] == "cpu"
+
+
+@pytest.mark.asyncio
+async def test_get_system_status_reports_default_collection(mock_setup):
+    # VECTOR_COLLECTIONS を使う場合も既定のコレクションのファイルを表示する
+    app_ctx = mock_setup["ctx"].request_context.lifespan_context
+    app_ctx.default_collection.parquet_path = "/data/docs.parquet"
+
+    status = await get_system_status(ctx=mock_setup["ctx"])
+
+    assert status["vector_file"] == "/data/docs.parquet (5.0 MB)"
+    mock_setup["get_file_info"].assert_called_with("/data/docs.parquet")
+
+    # mmap バックエンドではサイドカーのディレクトリを表示する
+    store = MagicMock()
+    store.directory = "/data/docs.mmap"
+    store.metadata = {"dtype": "float16"}
+    store.__len__.return_value = 10
+    app_ctx.default_collection.vector_store = store
+
+    status = await get_system_status(ctx=mock_setup["ctx"])
+
+    assert status["vector_backend"] == "mmap"
+    assert status["vector_file"] == "/data/docs.mmap (mmap, float16)"
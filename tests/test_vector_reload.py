@@ -0,0 +1,144 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import duckdb_rag as dr
+from server import (
+    DEFAULT_COLLECTION,
+    AppContext,
+    Collection,
+    get_parquet_signature,
+    reload_vector_db,
+    reload_vectors,
+)
+from tests.conftest import make_request
+
+
+@pytest.fixture
+def collection(tmp_path):
+    parquet_path = tmp_path / "vectors.parquet"
+    parquet_path.write_bytes(b"v1")
+
+    yield Collection(
+        name=DEFAULT_COLLECTION,
+        conn=MagicMock(),
+        parquet_path=str(parquet_path),
+        parquet_signature=get_parquet_signature(str(parquet_path)),
+    )
+
+
+def touch(path: str, content: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(content)
+    # 更新時刻の分解能に依存しないよう明示的に進める
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.asyncio
+async def test_reload_skips_unchanged_file(collection):
+    old_conn = collection.conn
+
+    with patch("server.open_vector_db") as mock_open:
+        reloaded = await reload_vector_db(collection)
+
+    assert reloaded is False
+    mock_open.assert_not_called()
+    assert collection.conn is old_conn
+
+
+@pytest.mark.asyncio
+async def test_reload_swaps_connection_on_change(collection):
+    old_conn = collection.conn
+    new_conn = MagicMock()
+    touch(collection.parquet_path, b"v2-longer")
+
+    with patch("server.open_vector_db", return_value=new_conn) as mock_open:
+        reloaded = await reload_vector_db(collection)
+
+    assert reloaded is True
+    mock_open.assert_called_once_with(collection.parquet_path)
+    assert collection.conn is new_conn
+    assert collection.parquet_signature == get_parquet_signature(
+        collection.parquet_path
+    )
+    old_conn.close.assert_called_once()
+    new_conn.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reload_failure_keeps_current_connection(collection):
+    old_conn = collection.conn
+    old_signature = collection.parquet_signature
+    touch(collection.parquet_path, b"broken")
+
+    with patch("server.open_vector_db", side_effect=ValueError("broken")):
+        with pytest.raises(ValueError):
+            await reload_vector_db(collection)
+
+    assert collection.conn is old_conn
+    assert collection.parquet_signature == old_signature
+    old_conn.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reload_vectors_tool_force(collection):
+    ctx = make_request(
+        AppContext(
+            model=MagicMock(),
+            tokenizer=MagicMock(),
+            collections={DEFAULT_COLLECTION: collection},
+        )
+    )
+    new_conn = MagicMock()
+
+    with (
+        patch("server.open_vector_db", return_value=new_conn),
+        patch("duckdb_rag.get_document_count", return_value=3),
+    ):
+        result = await reload_vectors(ctx=ctx, force=True)
+
+    assert result["reloaded"] is True
+    assert result["document_count"] == 3
+    assert collection.conn is new_conn
+
+
+@pytest.mark.asyncio
+async def test_reload_refuses_while_changes_are_pending(collection):
+    old_conn = collection.conn
+    collection.write_queue = dr.WriteBehindQueue(MagicMock(), delay=0)
+    collection.write_queue.mark_dirty()
+    touch(collection.parquet_path, b"v2-longer")
+
+    with patch("server.open_vector_db") as mock_open:
+        assert await reload_vector_db(collection) is False
+    mock_open.assert_not_called()
+    assert collection.conn is old_conn
+
+    # force では保留中の変更を破棄して読み込む
+    new_conn = MagicMock()
+    with patch("server.open_vector_db", return_value=new_conn):
+        assert await reload_vector_db(collection, force=True) is True
+    assert collection.conn is new_conn
+    assert collection.write_queue.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_reload_discards_load_when_changed_during_load(collection):
+    old_conn = collection.conn
+    new_conn = MagicMock()
+    collection.write_queue = dr.WriteBehindQueue(MagicMock(), delay=0)
+    touch(collection.parquet_path, b"v2-longer")
+
+    def open_while_editing(parquet_path):
+        # 読み込み中にドキュメントが変更される
+        collection.write_queue.mark_dirty()
+        return new_conn
+
+    with patch("server.open_vector_db", side_effect=open_while_editing):
+        assert await reload_vector_db(collection) is False
+
+    assert collection.conn is old_conn
+    new_conn.close.assert_called_once()
+    assert collection.write_queue.pending == 1